@@ -17,13 +17,13 @@ import json
 
 from PyQt5.QtWidgets import (QApplication, QWidget, QVBoxLayout, QHBoxLayout, QFileDialog,
                              QTableWidgetItem, QHeaderView, QSizePolicy)
-from qfluentwidgets import (ComboBox, PushButton, LineEdit, TableWidget, FluentIcon as FIF,
+from qfluentwidgets import (ComboBox, CheckBox, PushButton, LineEdit, TableWidget, FluentIcon as FIF,
                             Action, RoundMenu, InfoBar, InfoBarPosition,
                             FluentWindow, BodyLabel, MessageBox, TextEdit, Dialog, SegmentedWidget)
 
-from bk_asr.BcutASR import BcutASR
-from bk_asr.JianYingASR import JianYingASR
-from bk_asr.KuaiShouASR import KuaiShouASR
+from bk_asr.ASRPipeline import transcribe_file
+from bk_asr.BcutASR import UPLOAD_WORKERS
+from bk_asr.HttpClient import set_pool_size
 
 # 设置日志配置
 logging.basicConfig(
@@ -35,71 +35,32 @@ logging.basicConfig(
 class WorkerSignals(QObject):
     finished = Signal(str, str)
     errno = Signal(str, str)
-    progress = Signal(int, str, str)  # (行号, 状态, 消息) 用于显示每个任务的进度
+    progress = Signal(int, str, str)  # (进度, 文件路径, 阶段描述) 用于显示每个任务的进度
 
 
 class ASRWorker(QRunnable):
     """ASR处理工作线程"""
-    def __init__(self, file_path, asr_engine, export_format):
+    def __init__(self, file_path, asr_engine, export_formats):
         super().__init__()
         self.file_path = file_path
         self.asr_engine = asr_engine
-        self.export_format = export_format
+        self.export_formats = export_formats
         self.signals = WorkerSignals()
 
-        self.audio_path = None
-
     @Slot()
     def run(self):
         try:
-            use_cache = True
-            
-            # 检查文件类型,如果不是音频则转换
-            logging.info("[+]正在进ffmpeg转换")
-            audio_exts = ['.mp3', '.wav']
-            if not any(self.file_path.lower().endswith(ext) for ext in audio_exts):
-                temp_audio = self.file_path.rsplit(".", 1)[0] + ".mp3"
-                if not video2audio(self.file_path, temp_audio):
-                    raise Exception("音频转换失败，确保安装ffmpeg")
-                self.audio_path = temp_audio
-            else:
-                self.audio_path = self.file_path
-            
-            # 根据选择的 ASR 引擎实例化相应的类
-            if self.asr_engine == 'B 接口':
-                asr = BcutASR(self.audio_path, use_cache=use_cache)
-            elif self.asr_engine == 'J 接口':
-                asr = JianYingASR(self.audio_path, use_cache=use_cache)
-            elif self.asr_engine == 'K 接口':
-                asr = KuaiShouASR(self.audio_path, use_cache=use_cache)
-            elif self.asr_engine == 'Whisper':
-                # from bk_asr.WhisperASR import WhisperASR
-                # asr = WhisperASR(self.file_path, use_cache=use_cache)
-                raise NotImplementedError("WhisperASR 暂未实现")
-            else:
-                raise ValueError(f"未知的 ASR 引擎: {self.asr_engine}")
-
-            logging.info(f"开始处理文件: {self.file_path} 使用引擎: {self.asr_engine}")
-            result = asr.run()
-            
-            # 根据导出格式选择转换方法
-            save_ext = self.export_format.lower()
-            if save_ext == 'srt':
-                result_text = result.to_srt()
-            elif save_ext == 'ass':
-                result_text = result.to_ass()
-            elif save_ext == 'txt':
-                result_text = result.to_txt()
-                
-            logging.info(f"完成处理文件: {self.file_path} 使用引擎: {self.asr_engine}")
-            save_path = self.file_path.rsplit(".", 1)[0] + "." + save_ext
-            with open(save_path, "w", encoding="utf-8") as f:
-                f.write(result_text)
-            self.signals.finished.emit(self.file_path, result_text)
+            save_paths = transcribe_file(self.file_path, self.asr_engine, self.export_formats,
+                                         callback=self.on_event)
+            self.signals.finished.emit(self.file_path, "\n".join(save_paths))
         except Exception as e:
             logging.error(f"处理文件 {self.file_path} 时出错: {str(e)}")
             self.signals.errno.emit(self.file_path, f"处理时出错: {str(e)}")
 
+    def on_event(self, event):
+        """识别阶段事件，转发到界面显示进度"""
+        self.signals.progress.emit(event.progress, self.file_path, event.message)
+
 class UpdateCheckerThread(QThread):
     msg = pyqtSignal(str, str, str)  # 用于发送消息的信号
 
@@ -133,6 +94,8 @@ class ASRWidget(QWidget):
         self.max_threads = 3  # 设置最大线程数
         self.thread_pool = QThreadPool()
         self.thread_pool.setMaxThreadCount(self.max_threads)
+        # 连接池大小与并发任务数（含 B 接口分片并发上传）保持一致
+        set_pool_size(self.max_threads * UPLOAD_WORKERS)
         self.processing_queue = []
         self.workers = {}  # 维护文件路径到worker的映射
 
@@ -145,19 +108,25 @@ class ASRWidget(QWidget):
         engine_label = BodyLabel("选择接口:", self)
         engine_label.setFixedWidth(70)
         self.combo_box = ComboBox(self)
-        self.combo_box.addItems(['B 接口', 'J 接口', 'K 接口', 'Whisper'])
+        self.combo_box.addItems(['Auto', 'B 接口', 'J 接口', 'K 接口', 'Whisper'])
+        self.combo_box.setCurrentText('B 接口')
         engine_layout.addWidget(engine_label)
         engine_layout.addWidget(self.combo_box)
         layout.addLayout(engine_layout)
 
-        # 导出格式选择区域 
+        # 导出格式选择区域，可同时勾选多种格式
         format_layout = QHBoxLayout()
         format_label = BodyLabel("导出格式:", self)
         format_label.setFixedWidth(70)
-        self.format_combo = ComboBox(self)
-        self.format_combo.addItems(['SRT', 'TXT', 'ASS'])
         format_layout.addWidget(format_label)
-        format_layout.addWidget(self.format_combo)
+        self.format_checkboxes = {}
+        for fmt in ['SRT', 'TXT', 'ASS', 'LRC', 'JSON']:
+            checkbox = CheckBox(fmt, self)
+            checkbox.setChecked(fmt == 'SRT')
+            checkbox.stateChanged.connect(self.on_format_toggled)
+            format_layout.addWidget(checkbox)
+            self.format_checkboxes[fmt] = checkbox
+        format_layout.addStretch(1)
         layout.addLayout(format_layout)
 
         # 文件选择区域
@@ -194,6 +163,14 @@ class ASRWidget(QWidget):
 
         self.setAcceptDrops(True)
 
+    def on_format_toggled(self):
+        """至少保留一种导出格式"""
+        if not self.selected_formats():
+            self.sender().setChecked(True)
+
+    def selected_formats(self):
+        return [fmt for fmt, checkbox in self.format_checkboxes.items() if checkbox.isChecked()]
+
     def select_file(self):
         """选择文件对话框"""
         files, _ = QFileDialog.getOpenFileNames(self, "选择音频或视频文件", "",
@@ -260,6 +237,7 @@ class ASRWidget(QWidget):
                 worker = self.workers[file_path]
                 worker.signals.finished.disconnect(self.update_table)
                 worker.signals.errno.disconnect(self.handle_error)
+                worker.signals.progress.disconnect(self.update_progress)
                 # QThreadPool 不支持直接终止线程，通常需要设计任务可中断
                 # 这里仅移除引用
                 self.workers.pop(file_path, None)
@@ -298,7 +276,7 @@ class ASRWidget(QWidget):
         if current_row >= 0:
             file_path = self.table.item(current_row, 0).data(Qt.UserRole)
             status = self.table.item(current_row, 1).text()
-            if status == "处理中":
+            if status.startswith("处理中"):
                 InfoBar.warning(
                     title='当前文件正在处理中',
                     content="请等待当前文件处理完成后再重新处理。",
@@ -334,10 +312,10 @@ class ASRWidget(QWidget):
     def process_file(self, file_path):
         """处理单个文件"""
         selected_engine = self.combo_box.currentText()
-        selected_format = self.format_combo.currentText()
-        worker = ASRWorker(file_path, selected_engine, selected_format)
+        worker = ASRWorker(file_path, selected_engine, self.selected_formats())
         worker.signals.finished.connect(self.update_table)
         worker.signals.errno.connect(self.handle_error)
+        worker.signals.progress.connect(self.update_progress)
         self.thread_pool.start(worker)
         self.workers[file_path] = worker
 
@@ -348,6 +326,14 @@ class ASRWidget(QWidget):
             self.table.setItem(row, 1, status_item)
             self.update_start_button_state()
 
+    def update_progress(self, progress, file_path, message):
+        """显示文件当前的处理阶段与进度"""
+        row = self.find_row_by_file_path(file_path)
+        if row != -1 and file_path in self.workers:
+            status_item = self.create_non_editable_item(f"处理中 {progress}% {message}")
+            status_item.setForeground(QColor("orange"))
+            self.table.setItem(row, 1, status_item)
+
     def update_table(self, file_path, result):
         """更新表格中文件的处理状态"""
         row = self.find_row_by_file_path(file_path)
@@ -3565,29 +3551,6 @@ class MainWindow(FluentWindow):
         if title == "更新":
             sys.exit(0)
 
-def video2audio(input_file: str, output: str = "") -> bool:
-    """使用ffmpeg将视频转换为音频"""
-    # 创建output目录
-    output = Path(output)
-    output.parent.mkdir(parents=True, exist_ok=True)
-    output = str(output)
-
-    cmd = [
-        'ffmpeg',
-        '-i', input_file,
-        '-ac', '1',
-        '-f', 'mp3',
-        '-af', 'aresample=async=1',
-        '-y',
-        output
-    ]
-    result = subprocess.run(cmd, capture_output=True, check=True, encoding='utf-8', errors='replace')
-
-    if result.returncode == 0 and Path(output).is_file():
-        return True
-    else:
-        return False
-
 def start():
     # enable dpi scale
     QApplication.setHighDpiScaleFactorRoundingPolicy(
@@ -0,0 +1,230 @@
+"""ASR 批处理吞吐量基准测试
+
+使用 bk_asr.FakeServer 在本地模拟各接口，按 ASRWorker 的完整流程（ffmpeg 格式转换、校验值计算、
+缓存查询、上传、轮询、解析、导出字幕）并发处理不同时长的合成音频，
+输出吞吐量（文件/分钟）、p50/p95 延迟、峰值内存与上传字节数，并保存为 JSON 用于回归对比。
+
+用法:
+    python benchmark.py --engine bcut --durations 30 120 600 --files 6 --output baseline.json
+    python benchmark.py --engine bcut --compare baseline.json
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import wave
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import List, Optional
+
+from bk_asr.ASRPipeline import EXPORT_FORMATS, transcribe_file
+from bk_asr.AudioUtils import has_ffmpeg, run_ffmpeg
+from bk_asr.BaseASR import BaseASR
+from bk_asr.BcutASR import UPLOAD_WORKERS
+from bk_asr.FakeServer import FakeASRServer
+from bk_asr.HttpClient import set_pool_size
+from bk_asr.RateLimiter import DEFAULT_LIMITS, configure
+
+# 命令行引擎名 -> 界面中的引擎名称
+ENGINE_NAMES = {
+    "auto": "Auto",
+    "bcut": "B 接口",
+    "jianying": "J 接口",
+    "kuaishou": "K 接口",
+}
+
+# 合成 WAV 音频的采样率
+SAMPLE_RATE = 16000
+
+# 对比结果时展示的指标
+COMPARE_METRICS = ["files_per_minute", "p50", "p95", "peak_rss_mb", "bytes_uploaded"]
+
+
+def make_audio(path: str, duration: float, seed: int) -> str:
+    """生成指定时长的合成音频；WAV 直接写入噪声，其他格式通过 ffmpeg 生成"""
+    if path.endswith(".wav"):
+        rng = random.Random(seed)
+        with wave.open(path, "wb") as w:
+            w.setnchannels(1)
+            w.setsampwidth(2)
+            w.setframerate(SAMPLE_RATE)
+            w.writeframes(rng.randbytes(int(duration * SAMPLE_RATE) * 2))
+    else:
+        run_ffmpeg([
+            "-f", "lavfi", "-i", f"anoisesrc=d={duration}:c=pink:r={SAMPLE_RATE}:a=0.1:seed={seed}",
+            "-ac", "1", "-y", path
+        ])
+    return path
+
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(pct * len(values)))]
+
+
+def reset_peak_rss() -> bool:
+    """将进程的峰值内存重置为当前内存（仅 Linux 支持），返回是否成功"""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        return False
+    return True
+
+
+def peak_rss_mb() -> Optional[float]:
+    """当前进程的峰值内存（MB），Linux 上为 reset_peak_rss 之后的峰值，不支持的平台返回 None"""
+    try:
+        with open("/proc/self/status", "r") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS 以字节为单位，Linux 以 KB 为单位
+    return round(rss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def run_group(files: List[str], args, server: FakeASRServer) -> dict:
+    """并发处理一组文件，返回该组的统计结果"""
+    latencies = []
+    errors = []
+
+    def process(file_path: str):
+        start = time.monotonic()
+        try:
+            transcribe_file(file_path, ENGINE_NAMES[args.engine], args.export_formats,
+                            use_cache=True, transcode=args.transcode,
+                            fingerprint=args.fingerprint)
+        except Exception as e:
+            errors.append(f"{os.path.basename(file_path)}: {e}")
+            return
+        latencies.append(time.monotonic() - start)
+
+    server.reset_stats()
+    rss_reset = reset_peak_rss()
+    rss_before = peak_rss_mb()
+    start = time.monotonic()
+    with ThreadPoolExecutor(max_workers=args.threads) as executor:
+        list(executor.map(process, files))
+    elapsed = time.monotonic() - start
+    group_peak_rss = peak_rss_mb()
+    if not rss_reset and group_peak_rss is not None and group_peak_rss <= rss_before:
+        # 无法重置时峰值在整个进程内累计，未在本组创下新高则本组的峰值未知
+        group_peak_rss = None
+
+    return {
+        "files": len(files),
+        "errors": errors,
+        "seconds": round(elapsed, 3),
+        "files_per_minute": round(len(latencies) / elapsed * 60, 2) if elapsed else None,
+        "p50": round(percentile(latencies, 0.5), 3) if latencies else None,
+        "p95": round(percentile(latencies, 0.95), 3) if latencies else None,
+        "peak_rss_mb": group_peak_rss,
+        "bytes_uploaded": server.stats()["bytes_received"],
+    }
+
+
+def run_benchmark(args) -> dict:
+    if args.no_rate_limit:
+        for engine, endpoint in DEFAULT_LIMITS:
+            configure(engine, endpoint, 1e6, 1e6)
+    set_pool_size(args.threads * UPLOAD_WORKERS)
+
+    work_dir = tempfile.mkdtemp(prefix="bk_asr_bench_")
+    # 独立的缓存数据库，保证首轮全部未命中
+    BaseASR.CACHE_DB = os.path.join(work_dir, "asr_cache.db")
+
+    results = {}
+    server = FakeASRServer(latency=args.latency, failure_rate=args.failure_rate, workers=args.server_workers,
+                           processing_time=args.processing_time, realtime_factor=args.realtime_factor,
+                           seed=args.seed)
+    try:
+        with server:
+            for duration in args.durations:
+                files = [make_audio(os.path.join(work_dir, f"{duration:g}s_{i}.{args.format}"), duration,
+                                    args.seed + i * 1000 + int(duration))
+                         for i in range(args.files)]
+                logging.info(f"开始测试 {duration:g} 秒音频，共 {len(files)} 个文件")
+                results[f"{duration:g}"] = run_group(files, args, server)
+                if args.cache_pass:
+                    logging.info(f"缓存命中测试 {duration:g} 秒音频")
+                    results[f"{duration:g}-cached"] = run_group(files, args, server)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "config": {key: value for key, value in vars(args).items() if key not in ("output", "compare")},
+        "results": results,
+    }
+
+
+def print_results(report: dict, baseline: Optional[dict] = None) -> None:
+    for group, stats in report["results"].items():
+        print(f"[{group}] " + ", ".join(f"{key}={stats[key]}" for key in COMPARE_METRICS)
+              + (f", errors={len(stats['errors'])}" if stats["errors"] else ""))
+        if baseline is None or group not in baseline["results"]:
+            continue
+        old = baseline["results"][group]
+        for key in COMPARE_METRICS:
+            if old.get(key) and stats.get(key) is not None:
+                change = (stats[key] - old[key]) / old[key] * 100
+                print(f"    {key}: {old[key]} -> {stats[key]} ({change:+.1f}%)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ASR 批处理吞吐量基准测试（使用本地模拟接口）")
+    parser.add_argument("--engine", choices=list(ENGINE_NAMES), default="bcut")
+    parser.add_argument("--durations", type=float, nargs="+", default=[30, 120, 600], help="合成音频时长（秒）")
+    parser.add_argument("--files", type=int, default=6, help="每种时长的文件数")
+    parser.add_argument("--threads", type=int, default=3, help="并发处理的文件数，与界面默认值一致")
+    parser.add_argument("--format", default="m4a" if has_ffmpeg() else "wav",
+                        help="合成音频格式，非 mp3/wav 时会经过 ffmpeg 转换")
+    parser.add_argument("--export-formats", choices=EXPORT_FORMATS, nargs="+", default=["srt"],
+                        help="导出格式，可同时导出多种")
+    parser.add_argument("--transcode", action="store_true", help="上传前转码为 16kHz 单声道低码率音频")
+    parser.add_argument("--fingerprint", action="store_true", help="缓存 key 使用音频内容指纹而非文件校验值")
+    parser.add_argument("--no-rate-limit", action="store_true", help="取消客户端限速")
+    parser.add_argument("--cache-pass", action="store_true", help="每组再处理一遍，测试缓存命中路径")
+    parser.add_argument("--latency", type=float, default=0.05, help="模拟接口每个请求的延迟（秒）")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="模拟接口随机失败的概率")
+    parser.add_argument("--server-workers", type=int, default=4, help="模拟服务端同时处理的任务数")
+    parser.add_argument("--processing-time", type=float, default=1.0, help="模拟单个任务的固定处理耗时（秒）")
+    parser.add_argument("--realtime-factor", type=float, default=0.01, help="模拟处理耗时与音频时长之比")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="结果保存路径（JSON）")
+    parser.add_argument("--compare", help="与之前保存的结果对比")
+    args = parser.parse_args()
+
+    if args.format != "wav" and not has_ffmpeg():
+        parser.error(f"生成 {args.format} 格式需要 ffmpeg")
+
+    report = run_benchmark(args)
+    baseline = None
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+    print_results(report, baseline)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"结果已保存: {args.output}")
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.WARNING, format="%(asctime)s - %(levelname)s - %(message)s")
+    main()
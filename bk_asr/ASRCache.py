@@ -0,0 +1,180 @@
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from typing import Optional
+
+CACHE_DIR = os.path.join(tempfile.gettempdir(), "bk_asr")
+CACHE_DB = os.path.join(CACHE_DIR, "asr_cache.db")
+# 旧版单文件缓存，首次打开数据库时导入
+LEGACY_CACHE_FILE = os.path.join(CACHE_DIR, "asr_cache.json")
+
+# 缓存总大小上限（按条目 JSON 字节数计算），超出后按最近最少使用淘汰
+DEFAULT_MAX_SIZE = 200 * 1024 * 1024
+
+# 远程任务断点的有效期（秒），超过后视为服务端资源已过期
+CHECKPOINT_TTL = 24 * 3600
+
+
+class ASRCache:
+    """基于 SQLite 的 ASR 结果缓存
+
+    每个条目按 key 单独读写，不再整体加载/重写缓存文件；
+    总大小超过 max_size 时按最近访问时间淘汰最旧的条目。
+    """
+    _instances = {}
+    _instances_lock = threading.Lock()
+
+    def __init__(self, db_path: str = CACHE_DB, max_size: int = DEFAULT_MAX_SIZE):
+        self.db_path = db_path
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                "size INTEGER NOT NULL, accessed REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_cache_accessed ON cache (accessed)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS checkpoints ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, updated REAL NOT NULL)"
+            )
+        self._import_legacy()
+
+    @classmethod
+    def instance(cls, db_path: str = CACHE_DB) -> "ASRCache":
+        """获取进程内共享的缓存实例"""
+        with cls._instances_lock:
+            if db_path not in cls._instances:
+                cls._instances[db_path] = cls(db_path)
+            return cls._instances[db_path]
+
+    @contextmanager
+    def _connect(self):
+        """打开连接，退出时提交并关闭"""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def get(self, key: str) -> Optional[dict]:
+        """读取单个条目，未命中返回 None"""
+        try:
+            with self._lock, self._connect() as conn:
+                row = conn.execute("SELECT value FROM cache WHERE key = ?", (key,)).fetchone()
+                if row is None:
+                    return None
+                conn.execute("UPDATE cache SET accessed = ? WHERE key = ?", (time.time(), key))
+            return json.loads(row[0])
+        except (sqlite3.Error, json.JSONDecodeError) as e:
+            logging.error(f"Failed to read cache: {e}")
+            return None
+
+    def set(self, key: str, value: dict) -> None:
+        """写入单个条目，并在超出容量时淘汰旧条目"""
+        data = json.dumps(value, ensure_ascii=False)
+        size = len(data.encode("utf-8"))
+        try:
+            with self._lock, self._connect() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO cache (key, value, size, accessed) VALUES (?, ?, ?, ?)",
+                    (key, data, size, time.time())
+                )
+                self._evict(conn)
+        except sqlite3.Error as e:
+            logging.error(f"Failed to save cache: {e}")
+
+    def delete(self, key: str) -> None:
+        try:
+            with self._lock, self._connect() as conn:
+                conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+        except sqlite3.Error as e:
+            logging.error(f"Failed to delete cache: {e}")
+
+    def clear(self) -> None:
+        with self._lock, self._connect() as conn:
+            conn.execute("DELETE FROM cache")
+
+    def total_size(self) -> int:
+        with self._lock, self._connect() as conn:
+            return conn.execute("SELECT COALESCE(SUM(size), 0) FROM cache").fetchone()[0]
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock, self._connect() as conn:
+            return conn.execute("SELECT 1 FROM cache WHERE key = ?", (key,)).fetchone() is not None
+
+    def __len__(self) -> int:
+        with self._lock, self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+
+    def get_checkpoint(self, key: str, ttl: float = CHECKPOINT_TTL) -> Optional[dict]:
+        """读取远程任务断点（已上传资源、任务 ID 等），不存在或已过期时返回 None"""
+        try:
+            with self._lock, self._connect() as conn:
+                row = conn.execute("SELECT value, updated FROM checkpoints WHERE key = ?", (key,)).fetchone()
+                if row is None:
+                    return None
+                if time.time() - row[1] > ttl:
+                    conn.execute("DELETE FROM checkpoints WHERE key = ?", (key,))
+                    return None
+            return json.loads(row[0])
+        except (sqlite3.Error, json.JSONDecodeError) as e:
+            logging.error(f"Failed to read checkpoint: {e}")
+            return None
+
+    def set_checkpoint(self, key: str, value: dict) -> None:
+        """保存远程任务断点，断点不计入缓存容量，识别成功后由引擎删除"""
+        try:
+            with self._lock, self._connect() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO checkpoints (key, value, updated) VALUES (?, ?, ?)",
+                    (key, json.dumps(value, ensure_ascii=False), time.time())
+                )
+        except sqlite3.Error as e:
+            logging.error(f"Failed to save checkpoint: {e}")
+
+    def delete_checkpoint(self, key: str) -> None:
+        try:
+            with self._lock, self._connect() as conn:
+                conn.execute("DELETE FROM checkpoints WHERE key = ?", (key,))
+        except sqlite3.Error as e:
+            logging.error(f"Failed to delete checkpoint: {e}")
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        """按最近访问时间从旧到新删除条目，直到总大小不超过上限"""
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM cache").fetchone()[0]
+        if total <= self.max_size:
+            return
+        removed = 0
+        for key, size in conn.execute("SELECT key, size FROM cache ORDER BY accessed").fetchall():
+            if total <= self.max_size:
+                break
+            conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+            total -= size
+            removed += 1
+        logging.info(f"缓存超出上限，已淘汰 {removed} 条记录")
+
+    def _import_legacy(self) -> None:
+        """将旧版 asr_cache.json 中的条目导入数据库后删除旧文件"""
+        legacy_file = os.path.join(os.path.dirname(self.db_path), os.path.basename(LEGACY_CACHE_FILE))
+        if not os.path.exists(legacy_file):
+            return
+        try:
+            with open(legacy_file, 'r', encoding='utf-8') as f:
+                legacy = json.load(f)
+            if isinstance(legacy, dict):
+                for key, value in legacy.items():
+                    self.set(key, value)
+            os.remove(legacy_file)
+        except (json.JSONDecodeError, IOError) as e:
+            logging.error(f"Failed to import legacy cache: {e}")
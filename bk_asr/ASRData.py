@@ -1,9 +1,41 @@
+import io
 import json
+import os
 import re
-from typing import List
+from array import array
+from bisect import bisect_left, bisect_right
+from collections.abc import MutableSequence
+from contextlib import ExitStack
+from itertools import accumulate, islice
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple, Union
 from pathlib import Path
 
+# extend 每批处理的分段数，流式输入时避免一次性生成全部中间元组
+EXTEND_BATCH_SIZE = 4096
+
+# SRT时间字段 -> 毫秒，解析标准写法的时间行时查表代替 int()
+_SRT_HOURS = {f"{i:02}": i * 3600000 for i in range(100)}
+_SRT_MINUTES = {f"{i:02}": i * 60000 for i in range(100)}
+_SRT_SECONDS = {f"{i:02}": i * 1000 for i in range(100)}
+_SRT_MILLISECONDS = {f"{i:03}": i for i in range(1000)}
+
+# save / save_many 支持的格式
+SAVE_FORMATS = ['srt', 'ass', 'lrc', 'txt', 'json']
+
+# 非标准写法（如秒数只有一位）的SRT时间行
+SRT_TIME_PATTERN = re.compile(
+    r'(\d{2}):(\d{2}):(\d{1,2})[.,](\d{3})\s-->\s(\d{2}):(\d{2}):(\d{1,2})[.,](\d{3})'
+)
+
+
+def _to_ms(t) -> int:
+    """时间戳统一按整数毫秒存储"""
+    return t if type(t) is int else int(round(t))
+
+
 class ASRDataSeg:
+    __slots__ = ("text", "start_time", "end_time")
+
     def __init__(self, text, start_time, end_time):
         self.text = text
         self.start_time = start_time
@@ -22,7 +54,8 @@ class ASRDataSeg:
         """Convert to ASS timestamp format"""
         return self._ms_to_ass_ts(self.start_time), self._ms_to_ass_ts(self.end_time)
 
-    def _ms_to_lrc_time(self, ms) -> str:
+    @staticmethod
+    def _ms_to_lrc_time(ms) -> str:
         seconds = ms / 1000
         minutes, seconds = divmod(seconds, 60)
         return f"{int(minutes):02}:{seconds:.2f}"
@@ -54,19 +87,415 @@ class ASRDataSeg:
         return f"ASRDataSeg({self.text}, {self.start_time}, {self.end_time})"
 
 
+class _SegmentView(ASRDataSeg):
+    """ASRData 中第 index 段的视图，读写直接作用于列数据
+
+    视图按索引定位，在其之前插入或删除分段后会指向其他分段，需要长期持有时请复制为 ASRDataSeg。
+    """
+    __slots__ = ("_data", "_index")
+
+    def __init__(self, data: 'ASRData', index: int):
+        self._data = data
+        self._index = index
+
+    @property
+    def text(self) -> str:
+        return self._data._text_at(self._index)
+
+    @text.setter
+    def text(self, value: str):
+        self._data._set_text(self._index, value)
+
+    @property
+    def start_time(self) -> int:
+        return self._data._starts[self._index]
+
+    @start_time.setter
+    def start_time(self, value):
+        self._data._set_start(self._index, _to_ms(value))
+
+    @property
+    def end_time(self) -> int:
+        return self._data._ends[self._index]
+
+    @end_time.setter
+    def end_time(self, value):
+        self._data._set_end(self._index, _to_ms(value))
+
+
+class ASRSegments(MutableSequence):
+    """ASRData.segments 的列表接口，支持索引、切片、增删与排序，修改直接写回 ASRData 的列数据
+
+    单个索引返回分段视图，切片返回独立的 ASRDataSeg 列表。
+    """
+    __slots__ = ("_data",)
+
+    def __init__(self, data: 'ASRData'):
+        self._data = data
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __iter__(self) -> Iterator[ASRDataSeg]:
+        return iter(self._data)
+
+    def _index(self, index: int) -> int:
+        n = len(self._data)
+        if index < 0:
+            index += n
+        if not 0 <= index < n:
+            raise IndexError("segment index out of range")
+        return index
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [ASRDataSeg(*self._data._row(i)) for i in range(len(self._data))[index]]
+        return _SegmentView(self._data, self._index(index))
+
+    def __setitem__(self, index, value):
+        if not isinstance(index, slice):
+            index = self._index(index)
+            self._data._replace(index, index + 1, [value])
+            return
+        start, stop, step = index.indices(len(self._data))
+        value = list(ASRData._rows_of(value))
+        if step == 1:
+            self._data._replace(start, max(start, stop), value)
+            return
+        indices = range(start, stop, step)
+        if len(value) != len(indices):
+            raise ValueError(f"attempt to assign sequence of size {len(value)} "
+                             f"to extended slice of size {len(indices)}")
+        for i, row in zip(indices, value):
+            self._data._replace(i, i + 1, [row])
+
+    def __delitem__(self, index):
+        if not isinstance(index, slice):
+            index = self._index(index)
+            self._data._replace(index, index + 1, ())
+            return
+        start, stop, step = index.indices(len(self._data))
+        if step == 1:
+            self._data._replace(start, max(start, stop), ())
+            return
+        keep = set(range(len(self._data))) - set(range(start, stop, step))
+        self._data._reorder(sorted(keep))
+
+    def insert(self, index: int, value) -> None:
+        n = len(self._data)
+        index = min(max(index + n if index < 0 else index, 0), n)
+        self._data._replace(index, index, [value])
+
+    def append(self, value) -> None:
+        self._data.append(value)
+
+    def extend(self, values) -> None:
+        self._data.extend(values)
+
+    def reverse(self) -> None:
+        self._data._reorder(range(len(self._data) - 1, -1, -1))
+
+    def sort(self, key: Callable = None, reverse: bool = False) -> None:
+        """排序分段，未指定 key 时按 (开始时间, 结束时间) 排序"""
+        data = self._data
+        if key is None:
+            order = sorted(range(len(data)), key=lambda i: (data._starts[i], data._ends[i]), reverse=reverse)
+        else:
+            order = sorted(range(len(data)), key=lambda i: key(_SegmentView(data, i)), reverse=reverse)
+        data._reorder(order)
+
+    def __repr__(self) -> str:
+        return f"[{', '.join(str(seg) for seg in self)}]"
+
+
 class ASRData:
-    def __init__(self, segments: List[ASRDataSeg]):
-        self.segments = segments
+    """字幕数据，按列存储
+
+    开始/结束时间为整数毫秒数组，文本拼接为一个字符串并记录每段的长度；
+    segments 与迭代返回按索引读写列数据的 ASRDataSeg 视图，时间平移、过滤与导出直接在列上批量处理。
+    """
+
+    def __init__(self, segments: Iterable[Union[ASRDataSeg, Tuple[str, int, int]]] = ()):
+        self._starts = array('q')
+        self._ends = array('q')
+        self._lengths = array('I')
+        self._text = ""
+        # 追加后尚未拼接进 _text 的文本
+        self._pending = []
+        # 逐段修改的文本（索引 -> 新文本），读取整体文本时再一次性合并
+        self._edits = {}
+        # 每段文本在 _text 中的起始偏移，按需生成
+        self._offsets = None
+        # 时间区间索引，首次按时间查询时生成
+        self._interval_index = None
+        self.extend(segments)
+
+    @staticmethod
+    def _rows_of(segments) -> Iterator[Tuple[str, int, int]]:
+        """将 ASRDataSeg 或 (文本, 开始, 结束) 序列统一为元组"""
+        if isinstance(segments, ASRSegments):
+            segments = segments._data
+        if isinstance(segments, ASRData):
+            yield from segments.rows()
+            return
+        for seg in segments:
+            if isinstance(seg, ASRDataSeg):
+                yield seg.text, seg.start_time, seg.end_time
+            else:
+                yield tuple(seg)
+
+    @property
+    def segments(self) -> ASRSegments:
+        return ASRSegments(self)
+
+    @segments.setter
+    def segments(self, segments: Iterable[ASRDataSeg]):
+        rows = list(self._rows_of(segments))
+        self._replace(0, len(self), rows)
 
-    def __iter__(self):
-        return iter(self.segments)
+    def __iter__(self) -> Iterator[ASRDataSeg]:
+        for i in range(len(self._starts)):
+            yield _SegmentView(self, i)
     
     def __len__(self) -> int:
-        return len(self.segments)
-    
+        return len(self._starts)
+
+    def _invalidate(self) -> None:
+        """列数据被修改后清除派生数据"""
+        self._offsets = None
+        self._interval_index = None
+
+    def _get_offsets(self) -> array:
+        if self._offsets is None:
+            self._offsets = array('q', accumulate(self._lengths, initial=0))
+        return self._offsets
+
+    def _join_pending(self) -> None:
+        if self._pending:
+            self._pending.insert(0, self._text)
+            self._text = "".join(self._pending)
+            self._pending.clear()
+
+    def _get_text(self) -> str:
+        """合并追加与逐段修改的文本，返回与 _lengths 一致的完整文本"""
+        self._join_pending()
+        if self._edits:
+            offsets = self._get_offsets()
+            text = self._text
+            parts = []
+            pos = 0
+            for index in sorted(self._edits):
+                value = self._edits[index]
+                parts.append(text[pos:offsets[index]])
+                parts.append(value)
+                pos = offsets[index + 1]
+                self._lengths[index] = len(value)
+            parts.append(text[pos:])
+            self._text = "".join(parts)
+            self._edits.clear()
+            self._offsets = None
+        return self._text
+
+    def _text_at(self, index: int) -> str:
+        edited = self._edits.get(index)
+        if edited is not None:
+            return edited
+        # 未合并的修改不改变其他分段在 _text 中的位置
+        self._join_pending()
+        offsets = self._get_offsets()
+        return self._text[offsets[index]:offsets[index + 1]]
+
+    def _set_text(self, index: int, value: str) -> None:
+        self._edits[index] = value
+
+    def _row(self, index: int) -> Tuple[str, int, int]:
+        return self._text_at(index), self._starts[index], self._ends[index]
+
+    def texts(self) -> List[str]:
+        """所有分段的文本"""
+        text = self._get_text()
+        offsets = self._get_offsets()
+        return [text[offsets[i]:offsets[i + 1]] for i in range(len(self))]
+
+    def rows(self) -> Iterator[Tuple[str, int, int]]:
+        """按顺序返回 (文本, 开始时间, 结束时间)，不创建分段对象"""
+        text = self._get_text()
+        pos = 0
+        for length, start, end in zip(self._lengths, self._starts, self._ends):
+            yield text[pos:pos + length], start, end
+            pos += length
+
+    def append(self, segment: Union[ASRDataSeg, Tuple[str, int, int]]) -> None:
+        """在末尾添加一段"""
+        text, start, end = next(self._rows_of([segment]))
+        self._pending.append(text)
+        self._lengths.append(len(text))
+        start, end = _to_ms(start), _to_ms(end)
+        index = self._interval_index
+        if index is not None and isinstance(index[0], range) and (not self._starts or self._starts[-1] <= start):
+            # 开始时间仍有序，区间索引直接延长
+            max_ends = index[2]
+            max_ends.append(max(max_ends[-1], end) if max_ends else end)
+            self._interval_index = (range(len(self._starts) + 1), self._starts, max_ends, None)
+        else:
+            self._interval_index = None
+        self._starts.append(start)
+        self._ends.append(end)
+        if self._offsets is not None:
+            self._offsets.append(self._offsets[-1] + len(text))
+
+    def extend(self, segments: Iterable[Union[ASRDataSeg, Tuple[str, int, int]]]) -> None:
+        """在末尾批量添加分段"""
+        if isinstance(segments, ASRSegments):
+            segments = segments._data
+        if isinstance(segments, ASRData):
+            # 直接拼接列数据（包括 extend 自身）
+            self._pending.append(segments._get_text())
+            self._lengths.extend(array('I', segments._lengths))
+            self._starts.extend(array('q', segments._starts))
+            self._ends.extend(array('q', segments._ends))
+            self._invalidate()
+            return
+        rows = self._rows_of(segments)
+        while True:
+            batch = list(islice(rows, EXTEND_BATCH_SIZE))
+            if not batch:
+                break
+            texts = [row[0] for row in batch]
+            self._pending.append("".join(texts))
+            self._lengths.extend(array('I', map(len, texts)))
+            self._starts.extend(self._ms_array([row[1] for row in batch]))
+            self._ends.extend(self._ms_array([row[2] for row in batch]))
+            self._invalidate()
+
+    @staticmethod
+    def _ms_array(times) -> array:
+        try:
+            return array('q', times)
+        except TypeError:
+            # 包含浮点时间戳
+            return array('q', map(_to_ms, times))
+
+    def _replace(self, start: int, stop: int, segments) -> None:
+        """用 segments 替换 [start, stop) 范围内的分段"""
+        rows = list(self._rows_of(segments))
+        texts = [row[0] for row in rows]
+        text = self._get_text()
+        offsets = self._get_offsets()
+        self._text = "".join([text[:offsets[start]], *texts, text[offsets[stop]:]])
+        self._lengths[start:stop] = array('I', map(len, texts))
+        self._starts[start:stop] = self._ms_array([row[1] for row in rows])
+        self._ends[start:stop] = self._ms_array([row[2] for row in rows])
+        self._invalidate()
+
+    def _take(self, indices: Iterable[int]) -> 'ASRData':
+        """按索引顺序取出分段，生成新的 ASRData"""
+        indices = list(indices)
+        text = self._get_text()
+        offsets = self._get_offsets()
+        data = ASRData()
+        data._text = "".join([text[offsets[i]:offsets[i + 1]] for i in indices])
+        data._lengths = array('I', [self._lengths[i] for i in indices])
+        data._starts = array('q', [self._starts[i] for i in indices])
+        data._ends = array('q', [self._ends[i] for i in indices])
+        return data
+
+    def _reorder(self, indices: Iterable[int]) -> None:
+        data = self._take(indices)
+        self._text, self._lengths, self._starts, self._ends = data._text, data._lengths, data._starts, data._ends
+        self._invalidate()
+
+    def shift(self, offset: int) -> None:
+        """所有分段的时间戳平移 offset 毫秒"""
+        offset = _to_ms(offset)
+        self._starts = array('q', [t + offset for t in self._starts])
+        self._ends = array('q', [t + offset for t in self._ends])
+        self._invalidate()
+
+    def _set_start(self, index: int, start: int) -> None:
+        """修改单段开始时间；开始时间的排序不变时原地更新区间索引，否则等下次查询时重建"""
+        interval_index = self._interval_index
+        if interval_index is not None:
+            _, sorted_starts, _, positions = interval_index
+            pos = index if positions is None else positions[index]
+            if (pos > 0 and sorted_starts[pos - 1] > start) or \
+                    (pos + 1 < len(sorted_starts) and sorted_starts[pos + 1] < start):
+                self._interval_index = None
+            else:
+                sorted_starts[pos] = start
+        self._starts[index] = start
+
+    def _set_end(self, index: int, end: int) -> None:
+        """修改单段结束时间，并从该段的排序位置起更新结束时间的前缀最大值"""
+        self._ends[index] = end
+        interval_index = self._interval_index
+        if interval_index is None:
+            return
+        order, _, max_ends, positions = interval_index
+        pos = index if positions is None else positions[index]
+        ends = self._ends
+        running = max_ends[pos - 1] if pos > 0 else end
+        for p in range(pos, len(max_ends)):
+            running = max(running, ends[order[p]])
+            if max_ends[p] == running:
+                # 此后的前缀最大值都不受影响
+                break
+            max_ends[p] = running
+
+    def filter(self, predicate: Callable[[ASRDataSeg], bool]) -> 'ASRData':
+        """返回只包含 predicate 为真的分段的新 ASRData，predicate 接收分段的副本"""
+        return self._take(i for i, row in enumerate(self.rows()) if predicate(ASRDataSeg(*row)))
+
+    def _get_interval_index(self) -> Tuple[Union[range, List[int]], array, array, Optional[array]]:
+        """按开始时间排序的区间索引：(排序后的分段索引, 排序后的开始时间, 结束时间的前缀最大值,
+        各分段的排序位置)；已按开始时间排序时前两项直接使用 range 与 _starts，排序位置为 None"""
+        if self._interval_index is None:
+            starts, ends = self._starts, self._ends
+            if all(a <= b for a, b in zip(starts, islice(starts, 1, None))):
+                order = range(len(starts))
+                sorted_starts = starts
+                sorted_ends = ends
+                positions = None
+            else:
+                order = sorted(range(len(starts)), key=starts.__getitem__)
+                sorted_starts = array('q', [starts[i] for i in order])
+                sorted_ends = [ends[i] for i in order]
+                positions = array('q', bytes(8 * len(order)))
+                for pos, i in enumerate(order):
+                    positions[i] = pos
+            self._interval_index = (order, sorted_starts, array('q', accumulate(sorted_ends, max)), positions)
+        return self._interval_index
+
+    def _overlapping(self, t: int, hi: int) -> List[int]:
+        """结束时间晚于 t 的分段中，排序位置在 hi 之前的分段索引（按原顺序）"""
+        order, _, max_ends, _ = self._get_interval_index()
+        # 前缀最大值不超过 t 的位置之前的分段都已结束
+        lo = bisect_right(max_ends, t)
+        ends = self._ends
+        return sorted(i for i in (order[pos] for pos in range(lo, hi)) if ends[i] > t)
+
+    def indices_at(self, t: int) -> List[int]:
+        """时间 t（毫秒）处正在显示的分段索引，即 start_time <= t < end_time"""
+        _, starts, _, _ = self._get_interval_index()
+        return self._overlapping(t, bisect_right(starts, t))
+
+    def indices_between(self, t1: int, t2: int) -> List[int]:
+        """与时间区间 [t1, t2)（毫秒）有重叠的分段索引"""
+        _, starts, _, _ = self._get_interval_index()
+        return self._overlapping(t1, bisect_left(starts, t2))
+
+    def segment_at(self, t: int) -> Optional[ASRDataSeg]:
+        """时间 t（毫秒）处的字幕，有多段重叠时返回其中第一段，没有时返回 None"""
+        indices = self.indices_at(t)
+        return _SegmentView(self, indices[0]) if indices else None
+
+    def segments_between(self, t1: int, t2: int) -> List[ASRDataSeg]:
+        """与时间区间 [t1, t2)（毫秒）有重叠的所有分段"""
+        return [_SegmentView(self, i) for i in self.indices_between(t1, t2)]
+
     def has_data(self) -> bool:
         """Check if there are any utterances"""
-        return len(self.segments) > 0
+        return len(self) > 0
     
     def is_word_timestamp(self) -> bool:
         """
@@ -76,14 +505,14 @@ class ASRData:
         2. 对于中文，每个segment应该只包含一个汉字
         3. 允许20%的误差率
         """
-        if not self.segments:
+        if not self.has_data():
             return False
             
         valid_segments = 0
-        total_segments = len(self.segments)
+        total_segments = len(self)
         
-        for seg in self.segments:
-            text = seg.text.strip()
+        for text, _, _ in self.rows():
+            text = text.strip()
             # 检查是否只包含一个英文单词或一个汉字
             if (len(text.split()) == 1 and text.isascii()) or len(text.strip()) <= 2:
                 valid_segments += 1
@@ -94,29 +523,40 @@ class ASRData:
     def save(self, save_path: str, ass_style: str = None, layout: str = "原文在上") -> None:
         """Save the ASRData to a file"""
         # 根据文件后缀名选择保存格式
-        Path(save_path).parent.mkdir(parents=True, exist_ok=True)
-        if save_path.endswith('.srt'):
-            self.to_srt(save_path=save_path)
-        elif save_path.endswith('.txt'):
-            with open(save_path, 'w', encoding='utf-8') as f:
-                f.write(self.to_txt())
-        elif save_path.endswith('.json'):
-            with open(save_path, 'w', encoding='utf-8') as f:
-                json.dump(self.to_json(), f, ensure_ascii=False)
-        elif save_path.endswith('.ass'):
-            self.to_ass(save_path=save_path, style_str=ass_style, layout=layout)
-        else:
+        base_path, ext = os.path.splitext(save_path)
+        if ext[1:] not in SAVE_FORMATS:
             raise ValueError(f"Unsupported file extension: {save_path}")
+        self.save_many(base_path, [ext[1:]], ass_style=ass_style, layout=layout)
+
+    def save_many(self, base_path: str, formats: Iterable[str], ass_style: str = None,
+                  layout: str = "原文在上") -> List[str]:
+        """一次遍历分段同时保存多种格式，返回保存路径列表
+
+        Args:
+            base_path: 不含后缀名的保存路径，各格式保存为 base_path.<格式>
+            formats: 格式列表，可选值见 SAVE_FORMATS
+            ass_style: ASS样式字符串，为空则使用默认样式
+            layout: ASS字幕布局，同 to_ass
+        """
+        formats = list(dict.fromkeys(fmt.lower().lstrip('.') for fmt in formats))
+        for fmt in formats:
+            if fmt not in SAVE_FORMATS:
+                raise ValueError(f"Unsupported file extension: {fmt}")
+        Path(base_path).parent.mkdir(parents=True, exist_ok=True)
+        paths = [f"{base_path}.{fmt}" for fmt in formats]
+        with ExitStack() as stack:
+            files = {fmt: stack.enter_context(open(path, 'w', encoding='utf-8'))
+                     for fmt, path in zip(formats, paths)}
+            write_many(self, files, ass_style=ass_style, layout=layout)
+        return paths
 
     def to_txt(self) -> str:
         """Convert to plain text subtitle format (without timestamps)"""
-        return "\n".join(seg.transcript for seg in self.segments)
+        return "\n".join(self.texts())
 
     def to_srt(self, save_path=None) -> str:
         """Convert to SRT subtitle format"""
-        srt_text = "\n".join(
-            f"{n}\n{seg.to_srt_ts()}\n{seg.transcript}\n"
-            for n, seg in enumerate(self.segments, 1))
+        srt_text = "\n".join(_srt_entries(self))
         if save_path:
             with open(save_path, 'w', encoding='utf-8') as f:
                 f.write(srt_text)
@@ -124,9 +564,7 @@ class ASRData:
 
     def to_lrc(self, save_path=None) -> str:
         """Convert to LRC subtitle format"""
-        lrc_text = "\n".join(
-            f"{seg.to_lrc_ts()}{seg.transcript}" for seg in self.segments
-        )
+        lrc_text = "\n".join(_lrc_entries(self))
         if save_path:
             with open(save_path, 'w', encoding='utf-8') as f:
                 f.write(lrc_text)
@@ -134,16 +572,16 @@ class ASRData:
 
     def to_json(self) -> dict:
         result_json = {}
-        for i, segment in enumerate(self.segments, 1):
+        for i, (text, start_time, end_time) in enumerate(self.rows(), 1):
             # 检查是否有换行符
-            if "\n" in segment.text:
-                original_subtitle, translated_subtitle = segment.text.split("\n")
+            if "\n" in text:
+                original_subtitle, translated_subtitle = text.split("\n")
             else:
-                original_subtitle, translated_subtitle = segment.text, ""
+                original_subtitle, translated_subtitle = text, ""
 
             result_json[str(i)] = {
-                "start_time": segment.start_time,
-                "end_time": segment.end_time,
+                "start_time": start_time,
+                "end_time": end_time,
                 "original_subtitle": original_subtitle,
                 "translated_subtitle": translated_subtitle
             }
@@ -159,56 +597,7 @@ class ASRData:
         Returns:
             ASS格式字幕内容
         """
-        # 默认样式
-        if not style_str:
-            style_str = (
-                "[V4+ Styles]\n"
-                "Format: Name,Fontname,Fontsize,PrimaryColour,SecondaryColour,OutlineColour,BackColour,"
-                "Bold,Italic,Underline,StrikeOut,ScaleX,ScaleY,Spacing,Angle,BorderStyle,Outline,Shadow,"
-                "Alignment,MarginL,MarginR,MarginV,Encoding\n"
-                "Style: Default,微软雅黑,66,&H00FFFFFF,&H000000FF,&H00000000,&H00000000,-1,0,0,0,100,100,"
-                "0,0,1,2,0,2,10,10,10,1\n"
-                "Style: Translate,微软雅黑,40,&H00FFFFFF,&H000000FF,&H00000000,&H00000000,-1,0,0,0,100,100,"
-                "0,0,1,2,0,2,10,10,10,1"
-            )
-
-        # 构建ASS文件头
-        ass_content = (
-            "[Script Info]\n"
-            "; Script generated by VideoCaptioner\n"
-            "; https://github.com/weifeng2333\n"
-            "ScriptType: v4.00+\n"
-            "PlayResX: 1280\n"
-            "PlayResY: 720\n\n"
-            f"{style_str}\n\n"
-            "[Events]\n"
-            "Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text\n"
-        )
-
-        # 根据布局生成对话内容
-        for seg in self.segments:
-            start_time = seg.to_ass_ts()[0]
-            end_time = seg.to_ass_ts()[1]
-            dialogue_template = 'Dialogue: 0,{},{},{},,0,0,0,,{}\n'
-
-            # 检查是否有换行符分隔的原文和译文
-            if "\n" in seg.text:
-                original, translate = seg.text.split("\n")
-                if layout == "译文在上" and translate:
-                    ass_content += dialogue_template.format(start_time, end_time, "Secondary", original)
-                    ass_content += dialogue_template.format(start_time, end_time, "Default", translate)
-                elif layout == "原文在上" and translate:
-                    ass_content += dialogue_template.format(start_time, end_time, "Secondary", translate)
-                    ass_content += dialogue_template.format(start_time, end_time, "Default", original)
-                elif layout == "仅原文":
-                    ass_content += dialogue_template.format(start_time, end_time, "Default", original)
-                elif layout == "仅译文" and translate:
-                    ass_content += dialogue_template.format(start_time, end_time, "Default", translate)
-            else:
-                original = seg.text
-                ass_content += dialogue_template.format(start_time, end_time, "Default", original)
-            # 根据布局生成对话行
-            
+        ass_content = "".join(_ass_chunks(self, style_str, layout))
         if save_path:
             with open(save_path, 'w', encoding='utf-8') as f:
                 f.write(ass_content)
@@ -216,37 +605,192 @@ class ASRData:
 
     def merge_segments(self, start_index: int, end_index: int, merged_text: str = None):
             """合并从 start_index 到 end_index 的段（包含）。"""
-            if start_index < 0 or end_index >= len(self.segments) or start_index > end_index:
+            if start_index < 0 or end_index >= len(self) or start_index > end_index:
                 raise IndexError("无效的段索引。")
-            merged_start_time = self.segments[start_index].start_time
-            merged_end_time = self.segments[end_index].end_time
+            merged_start_time = self._starts[start_index]
+            merged_end_time = self._ends[end_index]
             if merged_text is None:
-                merged_text = ''.join(seg.text for seg in self.segments[start_index:end_index+1])
-            merged_seg = ASRDataSeg(merged_text, merged_start_time, merged_end_time)
-            # 替换 segments[start_index:end_index+1] 为 merged_seg
-            self.segments[start_index:end_index+1] = [merged_seg]
+                text = self._get_text()
+                offsets = self._get_offsets()
+                merged_text = text[offsets[start_index]:offsets[end_index + 1]]
+            # 替换 segments[start_index:end_index+1] 为合并后的段
+            self._replace(start_index, end_index + 1, [(merged_text, merged_start_time, merged_end_time)])
 
     def merge_with_next_segment(self, index: int) -> None:
         """合并指定索引的段与下一个段。"""
-        if index < 0 or index >= len(self.segments) - 1:
+        if index < 0 or index >= len(self) - 1:
             raise IndexError("索引超出范围或没有下一个段可合并。")
-        current_seg = self.segments[index]
-        next_seg = self.segments[index + 1]
 
         # 合并文本
-        merged_text = f"{current_seg.text} {next_seg.text}"
-        merged_start_time = current_seg.start_time
-        merged_end_time = next_seg.end_time
-        merged_seg = ASRDataSeg(merged_text, merged_start_time, merged_end_time)
+        merged_text = f"{self._text_at(index)} {self._text_at(index + 1)}"
+        merged_start_time = self._starts[index]
+        merged_end_time = self._ends[index + 1]
 
-        # 替换当前段为合并后的段
-        self.segments[index] = merged_seg
-        # 删除下一个段
-        del self.segments[index + 1]
+        # 用合并后的段替换当前段与下一个段
+        self._replace(index, index + 2, [(merged_text, merged_start_time, merged_end_time)])
 
     def __str__(self):
         return self.to_txt()
 
+# 默认ASS样式
+DEFAULT_ASS_STYLE = (
+    "[V4+ Styles]\n"
+    "Format: Name,Fontname,Fontsize,PrimaryColour,SecondaryColour,OutlineColour,BackColour,"
+    "Bold,Italic,Underline,StrikeOut,ScaleX,ScaleY,Spacing,Angle,BorderStyle,Outline,Shadow,"
+    "Alignment,MarginL,MarginR,MarginV,Encoding\n"
+    "Style: Default,微软雅黑,66,&H00FFFFFF,&H000000FF,&H00000000,&H00000000,-1,0,0,0,100,100,"
+    "0,0,1,2,0,2,10,10,10,1\n"
+    "Style: Translate,微软雅黑,40,&H00FFFFFF,&H000000FF,&H00000000,&H00000000,-1,0,0,0,100,100,"
+    "0,0,1,2,0,2,10,10,10,1"
+)
+
+ASS_DIALOGUE_TEMPLATE = 'Dialogue: 0,{},{},{},,0,0,0,,{}\n'
+
+
+def _srt_time(ms: int) -> str:
+    """整数毫秒 -> SRT时间（HH:MM:SS,mmm）"""
+    seconds, ms = divmod(ms, 1000)
+    minutes, seconds = divmod(seconds, 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours:02}:{minutes:02}:{seconds:02},{ms:03}"
+
+def _ass_time(ms: int) -> str:
+    """整数毫秒 -> ASS时间（H:MM:SS.cc）"""
+    seconds, ms = divmod(ms, 1000)
+    minutes, seconds = divmod(seconds, 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours:01}:{minutes:02}:{seconds:02}.{ms // 10:02}"
+
+def _srt_entries(asr_data: ASRData) -> Iterator[str]:
+    for n, (text, start, end) in enumerate(asr_data.rows(), 1):
+        yield f"{n}\n{_srt_time(start)} --> {_srt_time(end)}\n{text}\n"
+
+def _lrc_entries(asr_data: ASRData) -> Iterator[str]:
+    lrc_time = ASRDataSeg._ms_to_lrc_time
+    for text, start, _ in asr_data.rows():
+        yield f"[{lrc_time(start)}]{text}"
+
+def _ass_header(style_str: str = None) -> str:
+    """构建ASS文件头"""
+    return (
+        "[Script Info]\n"
+        "; Script generated by VideoCaptioner\n"
+        "; https://github.com/weifeng2333\n"
+        "ScriptType: v4.00+\n"
+        "PlayResX: 1280\n"
+        "PlayResY: 720\n\n"
+        f"{style_str or DEFAULT_ASS_STYLE}\n\n"
+        "[Events]\n"
+        "Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text\n"
+    )
+
+def _ass_dialogues(text: str, start_time: str, end_time: str, layout: str) -> str:
+    """根据布局生成一段字幕的对话行"""
+    dialogue = ASS_DIALOGUE_TEMPLATE.format
+    # 检查是否有换行符分隔的原文和译文
+    if "\n" not in text:
+        return dialogue(start_time, end_time, "Default", text)
+    original, translate = text.split("\n")
+    if layout == "译文在上" and translate:
+        return (dialogue(start_time, end_time, "Secondary", original)
+                + dialogue(start_time, end_time, "Default", translate))
+    elif layout == "原文在上" and translate:
+        return (dialogue(start_time, end_time, "Secondary", translate)
+                + dialogue(start_time, end_time, "Default", original))
+    elif layout == "仅原文":
+        return dialogue(start_time, end_time, "Default", original)
+    elif layout == "仅译文" and translate:
+        return dialogue(start_time, end_time, "Default", translate)
+    return ""
+
+def _ass_chunks(asr_data: ASRData, style_str: str = None, layout: str = "原文在上") -> Iterator[str]:
+    """依次生成ASS文件头与每段的对话行"""
+    yield _ass_header(style_str)
+    for text, start, end in asr_data.rows():
+        yield _ass_dialogues(text, _ass_time(start), _ass_time(end), layout)
+
+def _json_entry(n: int, text: str, start_time: int, end_time: int) -> str:
+    """to_json 中单个条目的 JSON 文本（与 json.dump 的默认分隔符一致）"""
+    # 检查是否有换行符
+    if "\n" in text:
+        original_subtitle, translated_subtitle = text.split("\n")
+    else:
+        original_subtitle, translated_subtitle = text, ""
+    return f'"{n}": ' + json.dumps({
+        "start_time": start_time,
+        "end_time": end_time,
+        "original_subtitle": original_subtitle,
+        "translated_subtitle": translated_subtitle
+    }, ensure_ascii=False)
+
+def _write_joined(f, chunks: Iterable[str], sep: str) -> None:
+    """写入与 sep.join(chunks) 相同的内容，不生成完整字符串"""
+    chunks = iter(chunks)
+    for first in chunks:
+        f.write(first)
+        f.writelines(sep + chunk for chunk in chunks)
+
+def write_srt(asr_data: ASRData, f) -> None:
+    """将SRT字幕逐段写入已打开的文本文件"""
+    _write_joined(f, _srt_entries(asr_data), "\n")
+
+def write_lrc(asr_data: ASRData, f) -> None:
+    """将LRC歌词逐段写入已打开的文本文件"""
+    _write_joined(f, _lrc_entries(asr_data), "\n")
+
+def write_txt(asr_data: ASRData, f) -> None:
+    """将纯文本逐段写入已打开的文本文件"""
+    _write_joined(f, (text for text, _, _ in asr_data.rows()), "\n")
+
+def write_ass(asr_data: ASRData, f, style_str: str = None, layout: str = "原文在上") -> None:
+    """将ASS字幕逐段写入已打开的文本文件，参数同 ASRData.to_ass"""
+    f.writelines(_ass_chunks(asr_data, style_str, layout))
+
+def write_many(asr_data: ASRData, files: dict, ass_style: str = None, layout: str = "原文在上") -> None:
+    """一次遍历分段，同时写入多种格式
+
+    Args:
+        files: 格式 -> 已打开的文本文件，格式可选值见 SAVE_FORMATS
+        ass_style: ASS样式字符串，为空则使用默认样式
+        layout: ASS字幕布局，同 to_ass
+    """
+    srt = files.get('srt')
+    ass = files.get('ass')
+    lrc = files.get('lrc')
+    txt = files.get('txt')
+    json_file = files.get('json')
+    lrc_time = ASRDataSeg._ms_to_lrc_time
+
+    if ass:
+        ass.write(_ass_header(ass_style))
+    if json_file:
+        json_file.write("{")
+    sep = ""
+    for n, (text, start, end) in enumerate(asr_data.rows(), 1):
+        if srt or ass:
+            # SRT与ASS共用时间拆分结果
+            start_s, start_ms = divmod(start, 1000)
+            start_m, start_s = divmod(start_s, 60)
+            start_h, start_m = divmod(start_m, 60)
+            end_s, end_ms = divmod(end, 1000)
+            end_m, end_s = divmod(end_s, 60)
+            end_h, end_m = divmod(end_m, 60)
+            if srt:
+                srt.write(f"{sep}{n}\n{start_h:02}:{start_m:02}:{start_s:02},{start_ms:03} --> "
+                          f"{end_h:02}:{end_m:02}:{end_s:02},{end_ms:03}\n{text}\n")
+            if ass:
+                ass.write(_ass_dialogues(text, f"{start_h:01}:{start_m:02}:{start_s:02}.{start_ms // 10:02}",
+                                         f"{end_h:01}:{end_m:02}:{end_s:02}.{end_ms // 10:02}", layout))
+        if lrc:
+            lrc.write(f"{sep}[{lrc_time(start)}]{text}")
+        if txt:
+            txt.write(sep + text)
+        if json_file:
+            json_file.write((", " if sep else "") + _json_entry(n, text, start, end))
+        sep = "\n"
+    if json_file:
+        json_file.write("}")
+
 def from_subtitle_file(file_path: str) -> 'ASRData':
     """从文件路径加载ASRData实例
     
@@ -263,16 +807,22 @@ def from_subtitle_file(file_path: str) -> 'ASRData':
     if not file_path.exists():
         raise FileNotFoundError(f"文件不存在: {file_path}")
         
+    suffix = file_path.suffix.lower()
+    if suffix == '.srt':
+        # 逐行解析，UTF-8 解码失败时才改用 GBK 重新读取
+        try:
+            with open(file_path, encoding='utf-8') as f:
+                return ASRData(iter_srt(f))
+        except UnicodeDecodeError:
+            with open(file_path, encoding='gbk') as f:
+                return ASRData(iter_srt(f))
+
     try:
         content = file_path.read_text(encoding='utf-8')
     except UnicodeDecodeError:
         content = file_path.read_text(encoding='gbk')
-        
-    suffix = file_path.suffix.lower()
-    
-    if suffix == '.srt':
-        return from_srt(content)
-    elif suffix == '.vtt':
+
+    if suffix == '.vtt':
         if '<c>' in content:  # YouTube VTT格式包含字级时间戳
             return from_youtube_vtt(content)
         return from_vtt(content)
@@ -306,38 +856,51 @@ def from_srt(srt_str: str) -> 'ASRData':
     :param srt_str: 包含SRT格式字幕的字符串。
     :return: 解析后的ASRData实例。
     """
-    segments = []
-    srt_time_pattern = re.compile(
-        r'(\d{2}):(\d{2}):(\d{1,2})[.,](\d{3})\s-->\s(\d{2}):(\d{2}):(\d{1,2})[.,](\d{3})'
-    )
+    return ASRData(iter_srt(io.StringIO(srt_str, newline=None)))
 
-    for block in re.split(r'\n\s*\n', srt_str.strip()):
-        lines = block.splitlines()
-        if len(lines) < 3:
-            continue
+def iter_srt(lines: Iterable[str]) -> Iterator[ASRDataSeg]:
+    """
+    逐行解析SRT字幕，依次返回每个分段，内存占用与文件大小无关。
 
-        match = srt_time_pattern.match(lines[1])
-        if not match:
+    :param lines: 保留换行符的字幕行，如以文本模式打开的文件对象。
+    :return: ASRDataSeg 迭代器。
+    """
+    block = []
+    append = block.append
+    for line in lines:
+        # 空行（含只有空白字符的行）分隔字幕块
+        if line.strip():
+            append(line)
             continue
+        if len(block) >= 3:
+            times = parse_srt_time_line(block[1])
+            if times:
+                yield ASRDataSeg(''.join(block[2:]).strip(), *times)
+        block.clear()
+    if len(block) >= 3:
+        times = parse_srt_time_line(block[1])
+        if times:
+            yield ASRDataSeg(''.join(block[2:]).strip(), *times)
 
-        time_parts = list(map(int, match.groups()))
-        start_time = sum([
-            time_parts[0] * 3600000,
-            time_parts[1] * 60000,
-            time_parts[2] * 1000,
-            time_parts[3]
-        ])
-        end_time = sum([
-            time_parts[4] * 3600000,
-            time_parts[5] * 60000,
-            time_parts[6] * 1000,
-            time_parts[7]
-        ])
-
-        text = '\n'.join(lines[2:]).strip()
-        segments.append(ASRDataSeg(text, start_time, end_time))
-
-    return ASRData(segments)
+def parse_srt_time_line(line: str) -> Optional[Tuple[int, int]]:
+    """
+    解析SRT时间行（HH:MM:SS,mmm --> HH:MM:SS,mmm），返回 (开始毫秒, 结束毫秒)，不是时间行时返回 None。
+    """
+    # 标准写法按固定位置查表取数字，其余写法交给正则
+    if (len(line) >= 29 and line[12:17] == ' --> ' and line[2] == line[5] == line[19] == line[22] == ':'
+            and line[8] in ',.' and line[25] in ',.'):
+        try:
+            return (_SRT_HOURS[line[0:2]] + _SRT_MINUTES[line[3:5]] + _SRT_SECONDS[line[6:8]]
+                    + _SRT_MILLISECONDS[line[9:12]],
+                    _SRT_HOURS[line[17:19]] + _SRT_MINUTES[line[20:22]] + _SRT_SECONDS[line[23:25]]
+                    + _SRT_MILLISECONDS[line[26:29]])
+        except KeyError:
+            pass
+    match = SRT_TIME_PATTERN.match(line)
+    if not match:
+        return None
+    h1, m1, s1, ms1, h2, m2, s2, ms2 = map(int, match.groups())
+    return h1 * 3600000 + m1 * 60000 + s1 * 1000 + ms1, h2 * 3600000 + m2 * 60000 + s2 * 1000 + ms2
 
 def from_vtt(vtt_str: str) -> 'ASRData':
     """
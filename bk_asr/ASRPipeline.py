@@ -0,0 +1,81 @@
+import logging
+from typing import Callable, Iterable, List, Optional, Union
+
+from .ASRData import ASRData, SAVE_FORMATS
+from .ASRRouter import AutoASR
+from .AudioUtils import video2audio
+from .BaseASR import ASREvent, BaseASR
+from .BcutASR import BcutASR
+from .JianYingASR import JianYingASR
+from .KuaiShouASR import KuaiShouASR
+
+# 界面中的引擎名称 -> 引擎类
+ENGINES = {
+    # 按各接口成功率与耗时自动选择，失败或熔断时切换到其他接口
+    'Auto': AutoASR,
+    'B 接口': BcutASR,
+    'J 接口': JianYingASR,
+    'K 接口': KuaiShouASR,
+}
+
+# 无需转换即可直接识别的音频格式
+AUDIO_EXTS = ['.mp3', '.wav']
+
+EXPORT_FORMATS = SAVE_FORMATS
+
+
+def prepare_audio(file_path: str) -> str:
+    """检查文件类型，不是音频时用 ffmpeg 转换为 mp3，返回用于识别的音频路径"""
+    if any(file_path.lower().endswith(ext) for ext in AUDIO_EXTS):
+        return file_path
+    temp_audio = file_path.rsplit(".", 1)[0] + ".mp3"
+    if not video2audio(file_path, temp_audio):
+        raise Exception("音频转换失败，确保安装ffmpeg")
+    return temp_audio
+
+
+def create_asr(engine: str, audio_path: str, use_cache: bool = True, transcode: bool = False,
+               fingerprint: bool = False) -> BaseASR:
+    """根据选择的 ASR 引擎实例化相应的类"""
+    if engine == 'Whisper':
+        # from bk_asr.WhisperASR import WhisperASR
+        # asr = WhisperASR(self.file_path, use_cache=use_cache)
+        raise NotImplementedError("WhisperASR 暂未实现")
+    if engine not in ENGINES:
+        raise ValueError(f"未知的 ASR 引擎: {engine}")
+    return ENGINES[engine](audio_path, use_cache=use_cache, transcode=transcode, fingerprint=fingerprint)
+
+
+def export(result: ASRData, file_path: str, export_formats: Union[str, Iterable[str]]) -> List[str]:
+    """按导出格式写入与源文件同名的字幕文件（多种格式只遍历一次分段），返回保存路径列表"""
+    if isinstance(export_formats, str):
+        export_formats = [export_formats]
+    export_formats = [fmt.lower() for fmt in export_formats]
+    for fmt in export_formats:
+        if fmt not in EXPORT_FORMATS:
+            raise ValueError(f"未知的导出格式: {fmt}")
+    return result.save_many(file_path.rsplit(".", 1)[0], export_formats)
+
+
+def transcribe_file(file_path: str, engine: str, export_formats: Union[str, Iterable[str]],
+                    use_cache: bool = True, transcode: bool = False, fingerprint: bool = False,
+                    callback: Optional[Callable[[ASREvent], None]] = None) -> List[str]:
+    """单个文件的完整处理流程：格式转换、识别（含缓存）、导出字幕
+
+    transcode 为 True 时上传前转码为 16kHz 单声道低码率音频，减少上传数据量（未安装 ffmpeg 时自动跳过）；
+    fingerprint 为 True 时按解码后的音频内容生成缓存 key，视频每次重新转换出的 mp3 也能命中缓存
+    （缓存 key 与默认的文件校验值不同，此前按校验值缓存的结果不会命中）；
+    callback 接收识别各阶段的 ASREvent。
+
+    Returns:
+        各导出格式的字幕保存路径
+    """
+    logging.info("[+]正在进ffmpeg转换")
+    audio_path = prepare_audio(file_path)
+    asr = create_asr(engine, audio_path, use_cache=use_cache, transcode=transcode, fingerprint=fingerprint)
+
+    logging.info(f"开始处理文件: {file_path} 使用引擎: {engine}")
+    result = asr.run(callback=callback)
+    save_paths = export(result, file_path, export_formats)
+    logging.info(f"完成处理文件: {file_path} 使用引擎: {engine}")
+    return save_paths
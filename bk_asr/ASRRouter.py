@@ -0,0 +1,79 @@
+import logging
+from typing import List, Sequence, Type, Union
+
+from .ASRData import ASRDataSeg
+from .BaseASR import BaseASR, SEGMENTS_CACHE_FIELD
+from .BcutASR import BcutASR
+from .EngineStats import EngineStats, engine_stats
+from .JianYingASR import JianYingASR
+from .KuaiShouASR import KuaiShouASR
+
+# 参与路由的引擎，统计数据相同时按此顺序优先
+DEFAULT_ENGINES = (BcutASR, JianYingASR, KuaiShouASR)
+
+
+class ASRRouter:
+    """根据引擎健康状况排序候选引擎
+
+    先按成功率（保留一位小数）从高到低，再按每秒音频的中位耗时从低到高排序；
+    没有历史记录的引擎视为健康且耗时为 0，以便尽快积累样本；熔断中的引擎排在最后。
+    """
+
+    def __init__(self, asr_classes: Sequence[Type[BaseASR]] = DEFAULT_ENGINES, stats: EngineStats = engine_stats):
+        self.asr_classes = list(asr_classes)
+        self.stats = stats
+
+    def _score(self, asr_class: Type[BaseASR]):
+        name = asr_class.__name__
+        success_rate = self.stats.success_rate(name)
+        p50 = self.stats.latency_percentile(name, 0.5, 1.0)
+        return (
+            not self.stats.is_available(name),
+            -round(1.0 if success_rate is None else success_rate, 1),
+            0.0 if p50 is None else p50,
+        )
+
+    def rank(self) -> List[Type[BaseASR]]:
+        return sorted(self.asr_classes, key=self._score)
+
+
+class AutoASR(BaseASR):
+    """自动选择引擎
+
+    按 ASRRouter 的排序依次尝试可用（未熔断）的引擎，失败时切换到下一个。
+    """
+    PREPARE_BEFORE_RUN = False
+
+    def __init__(self, audio_path: Union[str, bytes], use_cache: bool = False, router: ASRRouter = None,
+                 transcode: bool = False, fingerprint: bool = False):
+        # 转码在此完成一次，各候选引擎直接使用转码后的音频
+        super().__init__(audio_path, use_cache=use_cache, transcode=transcode, fingerprint=fingerprint)
+        self.router = router or ASRRouter()
+        self.engine = None
+
+    def _run(self) -> dict:
+        engines = [self._sub_engine(asr_class) for asr_class in self.router.rank()]
+        cached = self._cached_result(engines)
+        if cached is not None:
+            return cached
+
+        # 子引擎在各自运行前取用这里准备好的上传数据
+        self._prepare_upload()
+
+        last_error = None
+        for engine in engines:
+            name = engine.__class__.__name__
+            if not self.router.stats.allow_request(name):
+                logging.info(f"引擎 {name} 已熔断，跳过")
+                continue
+            logging.info(f"自动选择引擎: {name}")
+            self.engine = engine
+            try:
+                return self.segments_cache_entry(self.engine.run(callback=self._relay_event))
+            except (Exception, SystemExit) as e:
+                logging.warning(f"引擎 {name} 失败: {e}")
+                last_error = e
+        raise RuntimeError(f"没有可用的识别引擎: {last_error}")
+
+    def _make_segments(self, resp_data: dict) -> list[ASRDataSeg]:
+        return [ASRDataSeg(*seg) for seg in resp_data[SEGMENTS_CACHE_FIELD]]
@@ -0,0 +1,190 @@
+import hashlib
+import re
+import shutil
+import subprocess
+import threading
+from pathlib import Path
+from typing import List, Optional, Tuple, Union
+
+# 上传前转码参数：16kHz 单声道低码率，识别效果不受影响
+TRANSCODE_SAMPLE_RATE = 16000
+TRANSCODE_BITRATE = "32k"
+
+# 计算音频内容指纹时解码的采样率，以及读取解码输出的分块大小
+FINGERPRINT_SAMPLE_RATE = 8000
+FINGERPRINT_READ_SIZE = 256 * 1024
+
+# silencedetect 的静音判定阈值与最短静音时长（秒）
+SILENCE_NOISE_DB = -35
+SILENCE_MIN_DURATION = 0.5
+
+_DURATION_PATTERN = re.compile(r"Duration:\s*(\d+):(\d{2}):(\d{2}(?:\.\d+)?)")
+_PROGRESS_TIME_PATTERN = re.compile(r"time=(\d+):(\d{2}):(\d{2}(?:\.\d+)?)")
+_SILENCE_START_PATTERN = re.compile(r"silence_start:\s*(-?\d+(?:\.\d+)?)")
+_SILENCE_END_PATTERN = re.compile(r"silence_end:\s*(\d+(?:\.\d+)?)")
+
+
+def has_ffmpeg() -> bool:
+    return shutil.which("ffmpeg") is not None
+
+
+def run_ffmpeg(args: List[str], input_data: Optional[bytes] = None) -> subprocess.CompletedProcess:
+    """执行 ffmpeg 命令，stdout/stderr 以字节返回；input_data 不为空时通过 stdin 传入（输入写作 pipe:0）"""
+    if not has_ffmpeg():
+        raise RuntimeError("未找到 ffmpeg，请确保已安装并加入 PATH")
+    cmd = ["ffmpeg", "-hide_banner"] + (["-nostdin"] if input_data is None else []) + args
+    result = subprocess.run(cmd, input=input_data, capture_output=True)
+    if result.returncode != 0:
+        stderr = result.stderr.decode("utf-8", errors="replace")
+        raise RuntimeError(f"ffmpeg 执行失败: {stderr[-500:]}")
+    return result
+
+
+def video2audio(input_file: str, output: str = "") -> bool:
+    """使用ffmpeg将视频转换为音频"""
+    # 创建output目录
+    output = Path(output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output = str(output)
+
+    cmd = [
+        'ffmpeg',
+        '-i', input_file,
+        '-ac', '1',
+        '-f', 'mp3',
+        '-af', 'aresample=async=1',
+        '-y',
+        output
+    ]
+    result = subprocess.run(cmd, capture_output=True, check=True, encoding='utf-8', errors='replace')
+
+    if result.returncode == 0 and Path(output).is_file():
+        return True
+    else:
+        return False
+
+
+def parse_duration(stderr: str) -> Optional[float]:
+    """从 ffmpeg 输出中解析输入时长（秒）；管道输入没有 Duration 时取最后一条进度中的 time，都没有时返回 None"""
+    match = _DURATION_PATTERN.search(stderr)
+    if match is None:
+        matches = _PROGRESS_TIME_PATTERN.findall(stderr)
+        if not matches:
+            return None
+        hours, minutes, seconds = matches[-1]
+    else:
+        hours, minutes, seconds = match.groups()
+    return int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+
+
+def detect_silences(audio_path: str, noise_db: float = SILENCE_NOISE_DB,
+                    min_duration: float = SILENCE_MIN_DURATION) -> Tuple[float, List[Tuple[float, float]]]:
+    """使用 silencedetect 检测静音区间
+
+    Returns:
+        (音频总时长, [(静音开始, 静音结束), ...])，单位为秒
+    """
+    result = run_ffmpeg([
+        "-nostats", "-i", audio_path,
+        "-af", f"silencedetect=noise={noise_db}dB:d={min_duration}",
+        "-f", "null", "-"
+    ])
+    stderr = result.stderr.decode("utf-8", errors="replace")
+
+    duration = parse_duration(stderr) or 0.0
+
+    silences = []
+    silence_start = None
+    for line in stderr.splitlines():
+        start_match = _SILENCE_START_PATTERN.search(line)
+        if start_match:
+            silence_start = max(0.0, float(start_match.group(1)))
+            continue
+        end_match = _SILENCE_END_PATTERN.search(line)
+        if end_match and silence_start is not None:
+            silences.append((silence_start, float(end_match.group(1))))
+            silence_start = None
+    # 文件以静音结尾时只有 silence_start
+    if silence_start is not None and duration > silence_start:
+        silences.append((silence_start, duration))
+    return duration, silences
+
+
+def plan_chunks(duration: float, silences: List[Tuple[float, float]],
+                chunk_length: float) -> List[Tuple[float, float]]:
+    """根据静音区间规划切分点
+
+    每段目标长度为 chunk_length，优先在 [0.5, 1.0] 倍目标长度范围内最长的静音中点切分，
+    找不到静音时直接在目标长度处切分；剩余部分不足 1.2 倍目标长度时不再切分。
+    """
+    chunks = []
+    cursor = 0.0
+    while duration - cursor > chunk_length * 1.2:
+        window_start = cursor + chunk_length * 0.5
+        window_end = cursor + chunk_length
+        candidates = [(end - start, (start + end) / 2) for start, end in silences
+                      if window_start <= (start + end) / 2 <= window_end]
+        cut = max(candidates)[1] if candidates else window_end
+        chunks.append((cursor, cut))
+        cursor = cut
+    chunks.append((cursor, duration))
+    return chunks
+
+
+def extract_chunk(audio_path: str, start: float, end: float) -> bytes:
+    """截取 [start, end) 秒的音频，返回单声道 MP3 数据"""
+    result = run_ffmpeg([
+        "-ss", f"{start:.3f}", "-t", f"{end - start:.3f}", "-i", audio_path,
+        "-ac", "1", "-f", "mp3", "pipe:1"
+    ])
+    return result.stdout
+
+
+def transcode(audio: Union[str, bytes], output_path: str, audio_format: str = "mp3",
+              sample_rate: int = TRANSCODE_SAMPLE_RATE, bitrate: str = TRANSCODE_BITRATE) -> Optional[float]:
+    """转码为单声道低采样率音频并写入 output_path，返回 ffmpeg 报告的音频时长（秒），无法解析时为 None"""
+    input_data = audio if isinstance(audio, bytes) else None
+    result = run_ffmpeg([
+        "-i", "pipe:0" if input_data is not None else audio,
+        "-vn", "-ac", "1", "-ar", str(sample_rate), "-b:a", bitrate,
+        "-map_metadata", "-1", "-f", audio_format, "-y", output_path
+    ], input_data=input_data)
+    return parse_duration(result.stderr.decode("utf-8", errors="replace"))
+
+
+def _feed_stdin(stdin, data: bytes) -> None:
+    try:
+        stdin.write(data)
+    except (BrokenPipeError, OSError):
+        pass
+    finally:
+        try:
+            stdin.close()
+        except (BrokenPipeError, OSError):
+            pass
+
+
+def pcm_fingerprint(audio: Union[str, bytes], sample_rate: int = FINGERPRINT_SAMPLE_RATE) -> str:
+    """音频内容指纹：解码第一条音轨为单声道低采样率 PCM，边读取 ffmpeg 输出边计算哈希
+
+    与容器格式、元数据无关，重新封装或重复导出的同一段音频得到相同的指纹。
+    """
+    if not has_ffmpeg():
+        raise RuntimeError("未找到 ffmpeg，请确保已安装并加入 PATH")
+    input_data = audio if isinstance(audio, bytes) else None
+    cmd = ["ffmpeg", "-hide_banner", "-loglevel", "error"] + (["-nostdin"] if input_data is None else []) + [
+        "-i", "pipe:0" if input_data is not None else audio,
+        "-map", "0:a:0", "-ac", "1", "-ar", str(sample_rate), "-f", "s16le", "pipe:1"
+    ]
+    digest = hashlib.blake2b(digest_size=16)
+    with subprocess.Popen(cmd, stdin=subprocess.PIPE if input_data is not None else subprocess.DEVNULL,
+                          stdout=subprocess.PIPE, stderr=subprocess.PIPE) as proc:
+        if input_data is not None:
+            # 由单独线程写入 stdin，避免与读取 stdout 互相阻塞
+            threading.Thread(target=_feed_stdin, args=(proc.stdin, input_data), daemon=True).start()
+        for chunk in iter(lambda: proc.stdout.read(FINGERPRINT_READ_SIZE), b""):
+            digest.update(chunk)
+        stderr = proc.stderr.read()
+    if proc.returncode != 0:
+        raise RuntimeError(f"ffmpeg 执行失败: {stderr.decode('utf-8', errors='replace')[-500:]}")
+    return digest.hexdigest()
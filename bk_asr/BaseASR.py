@@ -1,82 +1,509 @@
-import json
+import asyncio
+import io
 import logging
+import mmap
 import os
-import zlib
 import tempfile
 import threading
+import time
+import wave
+import weakref
+import zlib
+from typing import BinaryIO, Callable, Iterator, List, NamedTuple, Optional, Type
 
+from .ASRCache import ASRCache, CACHE_DB
 from .ASRData import ASRDataSeg, ASRData
+from .AudioUtils import TRANSCODE_BITRATE, pcm_fingerprint, transcode
+from .EngineStats import engine_stats
+from .HttpClient import get_session
+from .RateLimiter import get_limiter
+from .SingleFlight import SingleFlight
+
+# 计算校验值等流式读取时的分块大小
+READ_CHUNK_SIZE = 1024 * 1024
+
+# 通用分段格式缓存条目的字段名，由 segments_cache_entry 生成
+SEGMENTS_CACHE_FIELD = "__segments__"
+
+# 无法读取文件头时用于估算时长的码率（bit/s），转码后的音频按转码码率估算
+ESTIMATED_BITRATE = 128 * 1000
+TRANSCODED_BITRATE = int(TRANSCODE_BITRATE.rstrip("k")) * 1000
+
+# 本地环境错误（音频文件缺失、无权限等），与引擎无关，不计入引擎统计
+LOCAL_ERRORS = (FileNotFoundError, PermissionError, IsADirectoryError, NotADirectoryError)
+
+# 转码临时文件目录
+TRANSCODE_DIR = os.path.join(tempfile.gettempdir(), "bk_asr", "transcode")
+
+# run()/arun() 通过 callback 上报的阶段，事件在阶段开始时发出
+STAGE_HASH = "hash"
+STAGE_CACHE_HIT = "cache_hit"
+STAGE_CACHE_MISS = "cache_miss"
+STAGE_UPLOAD = "upload"
+STAGE_QUEUED = "queued"
+STAGE_POLLING = "polling"
+STAGE_PARSE = "parse"
+STAGE_DONE = "done"
+
+
+class ASREvent(NamedTuple):
+    """识别过程中的阶段事件"""
+    stage: str
+    # 估计的整体进度（0-100）
+    progress: int
+    message: str
+    engine: str
+    timestamp: float
+    # 阶段数据，如耗时 seconds、已上传字节数 bytes、上传速率 bytes_per_sec
+    data: dict
+
+
+def _remove_file(path: str) -> None:
+    try:
+        os.remove(path)
+    except OSError:
+        pass
 
 
 class BaseASR:
     SUPPORTED_SOUND_FORMAT = ["flac", "m4a", "mp3", "wav"]
-    CACHE_FILE = os.path.join(tempfile.gettempdir(), "bk_asr", "asr_cache.json")
-    _lock = threading.Lock()
+    # 上传前转码的目标格式，需为引擎接受的格式
+    TRANSCODE_FORMAT = "mp3"
+    CACHE_DB = CACHE_DB
+    # 进程内所有引擎实例共享，用于合并相同音频的并发请求
+    _inflight = SingleFlight()
+    # arun() 使用的进行中任务，key -> asyncio.Future
+    _ainflight = {}
+    # 为 False 时由 _run 自行调用 _prepare_upload（组合引擎先查子引擎缓存，未命中再转码）
+    PREPARE_BEFORE_RUN = True
 
-    def __init__(self, audio_path: [str, bytes], use_cache: bool = False):
+    def __init__(self, audio_path: [str, bytes], use_cache: bool = False, transcode: bool = False,
+                 fingerprint: bool = False):
         self.audio_path = audio_path
-        self.file_binary = None
+        self.file_size = 0
+        self._data_bytes: Optional[bytes] = None
+        self._data_path: Optional[str] = None
+        self._mmap: Optional[mmap.mmap] = None
+        # 分片上传线程并发调用 _read_range，保证只创建一个 mmap
+        self._mmap_lock = threading.Lock()
+        # 上传数据（转码、CRC32）是否已准备好
+        self._prepared = False
+        self._transcoded = False
+        # 转码时由 ffmpeg 得到的音频时长（秒）
+        self._duration: Optional[float] = None
+        # 作为组合引擎的子引擎时持有父引擎，保证父引擎的转码临时文件在子引擎结束前不被删除
+        self._parent: Optional["BaseASR"] = None
+        # 被组合引擎放弃（结果已不再需要）的子引擎不计入引擎统计
+        self._abandoned = False
+        # 本次识别是否已向引擎发出远程请求，只有发出过请求的识别结果才计入引擎统计
+        self._remote_started = False
 
         self.crc32_hex = None
+        # 音频内容指纹，fingerprint 为 True 时代替 CRC32 作为缓存 key
+        self.fingerprint_hex: Optional[str] = None
         self.use_cache = use_cache
+        self.transcode = transcode
+        self.fingerprint = fingerprint
+        # 运行指标（如轮询次数、耗时），由各引擎按需填充
+        self.metrics = {}
+        # 远程任务断点，由支持恢复的引擎通过 _save_checkpoint 写入
+        self._checkpoint: Optional[dict] = None
 
+        # run()/arun() 期间发出的阶段事件
+        self.events: List[ASREvent] = []
+        self._callback: Optional[Callable[[ASREvent], None]] = None
+        self._upload_lock = threading.Lock()
+        self._upload_started = 0.0
+        self._uploaded = 0
+        self._poll_count = 0
+
+        # 转码与计算校验值在构造时完成，耗时在 run() 开始时随 hash 事件上报
+        start = time.monotonic()
         self._set_data()
+        self.metrics["hash_seconds"] = round(time.monotonic() - start, 3)
 
         self.cache = self._load_cache()
+        # 所有引擎共享的连接池会话
+        self.session = get_session()
 
-    def _load_cache(self):
+    def _load_cache(self) -> Optional[ASRCache]:
         if not self.use_cache:
-            return {}
-        os.makedirs(os.path.dirname(self.CACHE_FILE), exist_ok=True)
-        with self._lock:
-            if os.path.exists(self.CACHE_FILE):
-                try:
-                    with open(self.CACHE_FILE, 'r', encoding='utf-8') as f:
-                        cache = json.load(f)
-                        if isinstance(cache, dict):
-                            return cache
-                except (json.JSONDecodeError, IOError):
-                    return {}
-            return {}
-
-    def _save_cache(self):
-        if not self.use_cache:
-            return
-        with self._lock:
-            try:
-                with open(self.CACHE_FILE, 'w', encoding='utf-8') as f:
-                    json.dump(self.cache, f, ensure_ascii=False, indent=2)
-                if os.path.exists(self.CACHE_FILE) and os.path.getsize(self.CACHE_FILE) > 10 * 1024 * 1024:
-                    os.remove(self.CACHE_FILE)
-            except IOError as e:
-                logging.error(f"Failed to save cache: {e}")
+            return None
+        return ASRCache.instance(self.CACHE_DB)
 
     def _set_data(self):
+        """设置音频数据源
+
+        传入路径时不再整体读入内存，只分块计算 CRC32，
+        上传时通过 _read_range/_open_audio 按需读取。
+        传入另一个引擎实例（见 _sub_engine）时沿用其数据源、校验值与指纹，不再读取文件。
+        """
+        if isinstance(self.audio_path, BaseASR):
+            self._adopt(self.audio_path)
+            return
         if isinstance(self.audio_path, bytes):
-            self.file_binary = self.audio_path
+            self._data_bytes = self.audio_path
+            self.file_size = len(self._data_bytes)
         else:
             ext = self.audio_path.split(".")[-1].lower()
             assert ext in self.SUPPORTED_SOUND_FORMAT, f"Unsupported sound format: {ext}"
             assert os.path.exists(self.audio_path), f"File not found: {self.audio_path}"
-            with open(self.audio_path, "rb") as f:
-                self.file_binary = f.read()
-        crc32_value = zlib.crc32(self.file_binary) & 0xFFFFFFFF
-        self.crc32_hex = format(crc32_value, '08x')
+            self._data_path = self.audio_path
+            self.file_size = os.path.getsize(self._data_path)
+        if self.fingerprint:
+            self._compute_fingerprint()
+        # 有内容指纹时缓存 key 不依赖上传数据，转码推迟到缓存未命中后进行
+        if not self.fingerprint_hex:
+            self._prepare_upload()
+
+    def _prepare_upload(self):
+        """转码并计算上传数据的 CRC32，只执行一次；子引擎直接使用父引擎准备好的数据"""
+        if self._prepared:
+            return
+        if self._parent is not None:
+            self._parent._prepare_upload()
+            self._adopt(self._parent)
+            return
+        self._prepared = True
+        if self.transcode:
+            self._transcode()
+        crc32_value = 0
+        for chunk in self._iter_chunks():
+            crc32_value = zlib.crc32(chunk, crc32_value)
+        self.crc32_hex = format(crc32_value & 0xFFFFFFFF, '08x')
+
+    def _compute_fingerprint(self):
+        """按解码后的音频内容计算指纹（在转码之前，基于原始音频），失败时仍使用 CRC32"""
+        try:
+            self.fingerprint_hex = pcm_fingerprint(self._data_path or self._data_bytes)
+        except RuntimeError as e:
+            logging.warning(f"计算音频指纹失败，使用文件校验值作为缓存 key: {e}")
+
+    def _sub_engine(self, asr_class: Type["BaseASR"]) -> "BaseASR":
+        """创建识别本实例音频的子引擎，上传数据（转码、校验值）与缓存 key 均沿用本实例，不重复读取文件"""
+        return asr_class(self, use_cache=self.use_cache)
+
+    def _adopt(self, parent: "BaseASR") -> None:
+        """作为 parent 的子引擎，沿用其数据源、校验值、内容指纹与音频时长"""
+        self._parent = parent
+        self._data_bytes = parent._data_bytes
+        self._data_path = parent._data_path
+        self.file_size = parent.file_size
+        self.crc32_hex = parent.crc32_hex
+        self.fingerprint_hex = parent.fingerprint_hex
+        self._duration = parent._duration
+        self._transcoded = parent._transcoded
+        self._prepared = parent._prepared
+
+    @property
+    def cache_id(self) -> str:
+        """缓存 key 中标识音频的部分：启用指纹时为音频内容指纹，否则为文件 CRC32"""
+        return f"pcm-{self.fingerprint_hex}" if self.fingerprint_hex else self.crc32_hex
+
+    def _transcode(self):
+        """上传前转码为 16kHz 单声道低码率音频；转码失败或体积没有减小时保留原始数据"""
+        os.makedirs(TRANSCODE_DIR, exist_ok=True)
+        fd, output_path = tempfile.mkstemp(suffix=f".{self.TRANSCODE_FORMAT}", dir=TRANSCODE_DIR)
+        os.close(fd)
+        try:
+            self._duration = transcode(self._data_path or self._data_bytes, output_path, self.TRANSCODE_FORMAT)
+        except RuntimeError as e:
+            logging.warning(f"转码失败，使用原始音频: {e}")
+            _remove_file(output_path)
+            return
+        transcoded_size = os.path.getsize(output_path)
+        if transcoded_size >= self.file_size:
+            _remove_file(output_path)
+            return
+        logging.info(f"转码完成: {self.file_size // 1024}KB -> {transcoded_size // 1024}KB")
+        self._data_bytes = None
+        self._data_path = output_path
+        self.file_size = transcoded_size
+        self._transcoded = True
+        # 引擎实例被回收时删除转码产生的临时文件
+        weakref.finalize(self, _remove_file, output_path)
+
+    @property
+    def file_binary(self) -> bytes:
+        """完整音频数据（会一次性读入内存，上传请使用 _read_range/_open_audio）"""
+        if self._data_bytes is not None:
+            return self._data_bytes
+        with open(self._data_path, "rb") as f:
+            return f.read()
+
+    def _open_audio(self) -> BinaryIO:
+        """以文件对象形式打开音频数据，用于流式上传"""
+        if self._data_bytes is not None:
+            return io.BytesIO(self._data_bytes)
+        return open(self._data_path, "rb")
+
+    def _iter_chunks(self, chunk_size: int = READ_CHUNK_SIZE) -> Iterator[bytes]:
+        """分块读取音频数据"""
+        with self._open_audio() as f:
+            while True:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+
+    def _read_range(self, start: int, end: int) -> memoryview:
+        """读取 [start, end) 范围的数据，文件输入通过 mmap 按需映射，不产生整体拷贝"""
+        if self._data_bytes is not None:
+            return memoryview(self._data_bytes)[start:end]
+        if self.file_size == 0:
+            return memoryview(b"")
+        if self._mmap is None:
+            with self._mmap_lock:
+                if self._mmap is None:
+                    with open(self._data_path, "rb") as f:
+                        self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return memoryview(self._mmap)[start:end]
+
+    def _release_data(self):
+        """释放 mmap 映射"""
+        with self._mmap_lock:
+            if self._mmap is not None:
+                try:
+                    self._mmap.close()
+                except BufferError:
+                    # 仍有未释放的 memoryview 引用，交由垃圾回收处理
+                    pass
+                self._mmap = None
+
+    def _estimate_duration(self) -> float:
+        """估算音频时长（秒）：优先使用转码时 ffmpeg 给出的时长，WAV 读取文件头，其余格式按码率估算"""
+        if self._duration:
+            return self._duration
+        try:
+            with self._open_audio() as f, wave.open(f, "rb") as w:
+                return w.getnframes() / float(w.getframerate())
+        except (wave.Error, EOFError):
+            bitrate = TRANSCODED_BITRATE if self._transcoded else ESTIMATED_BITRATE
+            return self.file_size / (bitrate / 8)
+
+    def _limiter(self, endpoint: str):
+        for cls in type(self).__mro__:
+            limiter = get_limiter(cls.__name__, endpoint)
+            if limiter is not None:
+                return limiter
+        return None
+
+    def _mark_remote(self) -> None:
+        """远程请求发出前调用（由 _throttle 统一调用），首个请求时通知引擎统计占用熔断试探名额"""
+        if not self._remote_started:
+            self._remote_started = True
+            engine_stats.start_request(self.__class__.__name__)
+
+    def _throttle(self, endpoint: str) -> None:
+        """按引擎接口限速，进程内（可选跨进程）所有实例共享令牌桶"""
+        self._mark_remote()
+        limiter = self._limiter(endpoint)
+        if limiter is not None:
+            limiter.acquire()
+
+    async def _athrottle(self, endpoint: str) -> None:
+        self._mark_remote()
+        limiter = self._limiter(endpoint)
+        if limiter is not None:
+            await limiter.aacquire()
 
     def _get_key(self):
-        return f"{self.__class__.__name__}-{self.crc32_hex}"
+        return f"{self.__class__.__name__}-{self.cache_id}"
 
-    def run(self):
+    def run(self, callback: Optional[Callable[[ASREvent], None]] = None) -> ASRData:
+        """识别音频；callback 会依次收到各阶段的 ASREvent"""
+        self._start_events(callback)
         k = self._get_key()
-        if k in self.cache and self.use_cache:
-            resp_data = self.cache[k]
+        resp_data = self.cache.get(k) if self.use_cache else None
+        if resp_data is None:
+            self._emit(STAGE_CACHE_MISS, 10, "开始识别")
+            # 相同 key 的并发请求只提交一次远程任务，其余等待共享结果
+            resp_data, shared = self._inflight.do(k, lambda: self._run_and_cache(k))
+            if shared:
+                logging.info(f"复用进行中的相同任务结果: {k}")
         else:
+            self._emit(STAGE_CACHE_HIT, 90, "命中缓存")
+        return self._parse(resp_data)
+
+    def _run_and_cache(self, key: str) -> dict:
+        if self.PREPARE_BEFORE_RUN:
+            self._prepare_upload()
+        start = time.monotonic()
+        self._remote_started = False
+        try:
             resp_data = self._run()
-            # Cache the result
-            self.cache[k] = resp_data
-            self._save_cache()
-        segments = self._make_segments(resp_data)
-        return ASRData(segments)
+        except (Exception, SystemExit) as e:
+            self._record_outcome(False, time.monotonic() - start, e)
+            raise
+        finally:
+            self._release_data()
+        self._record_outcome(True, time.monotonic() - start)
+        # Cache the result
+        if self.use_cache:
+            self.cache.set(key, resp_data)
+        self._clear_checkpoint()
+        return resp_data
+
+    async def arun(self, callback: Optional[Callable[[ASREvent], None]] = None) -> ASRData:
+        """run() 的异步版本，等待远程结果时不占用线程"""
+        self._start_events(callback)
+        k = self._get_key()
+        resp_data = await asyncio.to_thread(self.cache.get, k) if self.use_cache else None
+        if resp_data is None:
+            self._emit(STAGE_CACHE_MISS, 10, "开始识别")
+            flight = self._ainflight.get(k)
+            if flight is not None and flight.get_loop() is asyncio.get_running_loop():
+                logging.info(f"复用进行中的相同任务结果: {k}")
+                resp_data = await asyncio.shield(flight)
+            else:
+                flight = asyncio.ensure_future(self._arun_and_cache(k))
+                self._ainflight[k] = flight
+                try:
+                    resp_data = await asyncio.shield(flight)
+                finally:
+                    if self._ainflight.get(k) is flight:
+                        del self._ainflight[k]
+        else:
+            self._emit(STAGE_CACHE_HIT, 90, "命中缓存")
+        return self._parse(resp_data)
+
+    async def _arun_and_cache(self, key: str) -> dict:
+        if self.PREPARE_BEFORE_RUN:
+            await asyncio.to_thread(self._prepare_upload)
+        start = time.monotonic()
+        self._remote_started = False
+        try:
+            resp_data = await self._arun()
+        except (Exception, SystemExit) as e:
+            self._record_outcome(False, time.monotonic() - start, e)
+            if isinstance(e, SystemExit):
+                # 任务中抛出的 SystemExit 会直接终止整个事件循环，转换为普通异常交给调用方处理
+                raise RuntimeError(str(e)) from e
+            raise
+        finally:
+            self._release_data()
+        self._record_outcome(True, time.monotonic() - start)
+        if self.use_cache:
+            await asyncio.to_thread(self.cache.set, key, resp_data)
+        await asyncio.to_thread(self._clear_checkpoint)
+        return resp_data
+
+    def _record_outcome(self, success: bool, seconds: float, error: Optional[BaseException] = None) -> None:
+        """记录本次识别的结果与耗时到引擎统计
+
+        只记录远程调用的结果：未发出远程请求的识别（本地出错、组合引擎自身）、本地环境错误
+        以及已被组合引擎放弃的子引擎均不记录。
+        """
+        if self._abandoned or not self._remote_started or isinstance(error, LOCAL_ERRORS):
+            return
+        if success:
+            engine_stats.record(self.__class__.__name__, seconds, self._estimate_duration())
+        else:
+            engine_stats.record_failure(self.__class__.__name__, seconds, self._estimate_duration())
+
+    async def _arun(self) -> dict:
+        """_run 的异步版本，默认在线程中执行同步实现，子类可覆盖为原生异步实现"""
+        return await asyncio.to_thread(self._run)
+
+    def _parse(self, resp_data: dict) -> ASRData:
+        self._emit(STAGE_PARSE, 95, "解析识别结果")
+        asr_data = self._make_data(resp_data)
+        self._emit(STAGE_DONE, 100, "识别完成", segments=len(asr_data.segments))
+        logging.info(f"{self.__class__.__name__} 各阶段耗时: {self.stage_timings()}")
+        return asr_data
+
+    def _start_events(self, callback: Optional[Callable[[ASREvent], None]]) -> None:
+        self._callback = callback
+        self.events = []
+        self._poll_count = 0
+        self._emit(STAGE_HASH, 5, "校验完成", seconds=self.metrics["hash_seconds"], bytes=self.file_size)
+
+    def _emit(self, stage: str, progress: int, message: str, **data) -> None:
+        """记录阶段事件并通知 callback，callback 出错不影响识别"""
+        self._record_event(ASREvent(stage, progress, message, self.__class__.__name__, time.time(), data))
+
+    def _relay_event(self, event: ASREvent) -> None:
+        """转发内部引擎上传、排队与轮询阶段的事件（用于组合引擎）"""
+        if event.stage in (STAGE_UPLOAD, STAGE_QUEUED, STAGE_POLLING):
+            self._record_event(event)
+
+    def _record_event(self, event: ASREvent) -> None:
+        self.events.append(event)
+        if self._callback is not None:
+            try:
+                self._callback(event)
+            except Exception as e:
+                logging.warning(f"进度回调出错: {e}")
+
+    def _start_upload(self) -> None:
+        with self._upload_lock:
+            self._upload_started = time.monotonic()
+            self._uploaded = 0
+            self._emit(STAGE_UPLOAD, 10, "开始上传", bytes=0, total=self.file_size, bytes_per_sec=0)
+
+    def _add_uploaded(self, size: int) -> None:
+        """累计已上传字节数并上报进度（10%-40%）与平均速率，可在多个上传线程中调用"""
+        with self._upload_lock:
+            self._uploaded += size
+            rate = self._uploaded / max(time.monotonic() - self._upload_started, 1e-6)
+            ratio = self._uploaded / max(self.file_size, 1)
+            self._emit(STAGE_UPLOAD, 10 + int(30 * ratio), f"上传中 {ratio:.0%} ({rate / 1024:.0f}KB/s)",
+                       bytes=self._uploaded, total=self.file_size, bytes_per_sec=round(rate))
+
+    def _emit_queued(self, task_id: str, resumed: bool = False) -> None:
+        message = f"从断点恢复任务: {task_id}" if resumed else f"任务已提交: {task_id}"
+        self._emit(STAGE_QUEUED, 50, message, task_id=task_id, resumed=resumed)
+
+    def _emit_polling(self, state=None) -> None:
+        self._poll_count += 1
+        self._emit(STAGE_POLLING, min(90, 55 + self._poll_count), f"等待识别结果（第{self._poll_count}次查询）",
+                   polls=self._poll_count, state=state)
+
+    def stage_timings(self) -> dict:
+        """各阶段耗时（秒），即每个事件到下一个事件的时间，同一阶段多次事件累加；hash 阶段取构造时的实际耗时"""
+        timings = {}
+        for event, next_event in zip(self.events, self.events[1:]):
+            timings[event.stage] = timings.get(event.stage, 0.0) + next_event.timestamp - event.timestamp
+        if self.events:
+            timings[STAGE_HASH] = self.metrics.get("hash_seconds", 0.0)
+        return {stage: round(seconds, 3) for stage, seconds in timings.items()}
+
+    def _load_checkpoint(self) -> dict:
+        """读取该音频上次中断时保存的远程任务断点，没有时返回空字典"""
+        self._checkpoint = ASRCache.instance(self.CACHE_DB).get_checkpoint(self._get_key()) or {}
+        return dict(self._checkpoint)
+
+    def _save_checkpoint(self, **state) -> None:
+        """合并保存远程任务断点（如已上传的资源、任务 ID），重新运行时据此跳过已完成的步骤"""
+        self._checkpoint = {**(self._checkpoint or {}), **state}
+        ASRCache.instance(self.CACHE_DB).set_checkpoint(self._get_key(), self._checkpoint)
+
+    def _clear_checkpoint(self) -> None:
+        if self._checkpoint:
+            ASRCache.instance(self.CACHE_DB).delete_checkpoint(self._get_key())
+        self._checkpoint = None
+
+    def _make_data(self, resp_data: dict) -> ASRData:
+        """将响应数据转换为 ASRData，兼容其他引擎写入的通用分段格式"""
+        if SEGMENTS_CACHE_FIELD in resp_data:
+            return ASRData(resp_data[SEGMENTS_CACHE_FIELD])
+        return ASRData(self._make_segments(resp_data))
+
+    @staticmethod
+    def segments_cache_entry(asr_data: ASRData) -> dict:
+        """生成与引擎无关的缓存条目，可写入任意引擎的 key"""
+        return {SEGMENTS_CACHE_FIELD: [list(row) for row in asr_data.rows()]}
+
+    def _cached_result(self, engines: List["BaseASR"]) -> Optional[dict]:
+        """在其他引擎实例的缓存中查找同一音频的结果，返回通用分段格式条目"""
+        if not self.use_cache:
+            return None
+        for engine in engines:
+            cached = self.cache.get(engine._get_key())
+            if cached is not None:
+                logging.info(f"命中引擎缓存: {engine._get_key()}")
+                return self.segments_cache_entry(engine._make_data(cached))
+        return None
 
     def _make_segments(self, resp_data: dict) -> list[ASRDataSeg]:
         raise NotImplementedError("_make_segments method must be implemented in subclass")
@@ -1,30 +1,49 @@
+import asyncio
 import json
 import logging
 import time
+from concurrent.futures import ThreadPoolExecutor
 from os import PathLike
 from typing import Optional
 
+import httpx
 import requests
 
 from .ASRData import ASRData, ASRDataSeg
 from .BaseASR import BaseASR
+from .HttpClient import get_async_client
+from .Poller import AdaptivePoller
 
 
 __version__ = "0.0.3"
 
 API_BASE_URL = "https://member.bilibili.com/x/bcut/rubick-interface"
 
+# 以下接口路径均相对于 BcutASR.base_url
 # 申请上传
-API_REQ_UPLOAD = API_BASE_URL + "/resource/create"
+API_REQ_UPLOAD = "/resource/create"
 
 # 提交上传
-API_COMMIT_UPLOAD = API_BASE_URL + "/resource/create/complete"
+API_COMMIT_UPLOAD = "/resource/create/complete"
 
 # 创建任务
-API_CREATE_TASK = API_BASE_URL + "/task"
+API_CREATE_TASK = "/task"
 
 # 查询结果
-API_QUERY_RESULT = API_BASE_URL + "/task/result"
+API_QUERY_RESULT = "/task/result"
+
+# 任务状态
+TASK_STATE_ERROR = 3
+TASK_STATE_COMPLETE = 4
+
+# 分片并发上传线程数
+UPLOAD_WORKERS = 4
+
+# 单个分片上传失败后的最大尝试次数
+UPLOAD_RETRIES = 3
+
+# 逐字模式结果中的字段名，值为 {"text": [...], "start_time": [...], "end_time": [...]}
+WORDS_FIELD = "words"
 
 
 class BcutASR(BaseASR):
@@ -33,10 +52,14 @@ class BcutASR(BaseASR):
         'User-Agent': 'Bilibili/1.0.0 (https://www.bilibili.com)',
         'Content-Type': 'application/json'
     }
+    # 接口地址，可替换为本地模拟服务（见 FakeServer）
+    base_url = API_BASE_URL
 
-    def __init__(self, audio_path: [str, bytes], use_cache: bool = False):
-        super().__init__(audio_path, use_cache=use_cache)
-        self.session = requests.Session()
+    def __init__(self, audio_path: [str, bytes], use_cache: bool = False, upload_workers: int = UPLOAD_WORKERS,
+                 transcode: bool = False, need_word_time_stamp: bool = False, fingerprint: bool = False):
+        super().__init__(audio_path, use_cache=use_cache, transcode=transcode, fingerprint=fingerprint)
+        self.upload_workers = upload_workers
+        self.need_word_time_stamp = need_word_time_stamp
         self.task_id = None
         self.__etags = []
 
@@ -54,18 +77,19 @@ class BcutASR(BaseASR):
 
     def upload(self) -> None:
         """申请上传"""
-        if not self.file_binary:
+        if not self.file_size:
             raise ValueError("none set data")
         payload = json.dumps({
             "type": 2,
             "name": "audio.mp3",
-            "size": len(self.file_binary),
+            "size": self.file_size,
             "ResourceFileType": "mp3",
             "model_id": "8",
         })
 
-        resp = requests.post(
-            API_REQ_UPLOAD,
+        self._throttle("upload")
+        resp = self.session.post(
+            self.base_url + API_REQ_UPLOAD,
             data=payload,
             headers=self.headers
         )
@@ -83,24 +107,43 @@ class BcutASR(BaseASR):
         logging.info(
             f"申请上传成功, 总计大小{resp_data['size'] // 1024}KB, {self.__clips}分片, 分片大小{resp_data['per_size'] // 1024}KB: {self.__in_boss_key}"
         )
+        self._start_upload()
         self.__upload_part()
         self.__commit_upload()
 
     def __upload_part(self) -> None:
-        """上传音频数据"""
-        for clip in range(self.__clips):
-            start_range = clip * self.__per_size
-            end_range = (clip + 1) * self.__per_size
-            logging.info(f"开始上传分片{clip}: {start_range}-{end_range}")
-            resp = requests.put(
-                self.__upload_urls[clip],
-                data=self.file_binary[start_range:end_range],
-                headers=self.headers
-            )
-            resp.raise_for_status()
-            etag = resp.headers.get("Etag")
-            self.__etags.append(etag)
-            logging.info(f"分片{clip}上传成功: {etag}")
+        """并发上传音频分片，按分片顺序收集 Etag"""
+        workers = max(1, min(self.upload_workers, self.__clips))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            self.__etags = list(executor.map(self.__upload_clip, range(self.__clips)))
+
+    def __upload_clip(self, clip: int) -> str:
+        """上传单个分片，失败时重试"""
+        start_range = clip * self.__per_size
+        end_range = min((clip + 1) * self.__per_size, self.file_size)
+        data = self._read_range(start_range, end_range)
+        try:
+            for attempt in range(1, UPLOAD_RETRIES + 1):
+                logging.info(f"开始上传分片{clip}: {start_range}-{end_range}")
+                try:
+                    resp = self.session.put(
+                        self.__upload_urls[clip],
+                        data=data,
+                        headers=self.headers
+                    )
+                    resp.raise_for_status()
+                except requests.exceptions.RequestException as e:
+                    if attempt == UPLOAD_RETRIES:
+                        raise
+                    logging.warning(f"分片{clip}上传失败({attempt}/{UPLOAD_RETRIES}): {e}")
+                    time.sleep(attempt)
+                    continue
+                etag = resp.headers.get("Etag")
+                logging.info(f"分片{clip}上传成功: {etag}")
+                self._add_uploaded(end_range - start_range)
+                return etag
+        finally:
+            data.release()
 
     def __commit_upload(self) -> None:
         """提交上传数据"""
@@ -111,47 +154,174 @@ class BcutASR(BaseASR):
             "UploadId": self.__upload_id,
             "model_id": "8",
         })
-        resp = requests.post(
-            API_COMMIT_UPLOAD,
+        self._throttle("upload")
+        resp = self.session.post(
+            self.base_url + API_COMMIT_UPLOAD,
             data=data,
             headers=self.headers
         )
         resp.raise_for_status()
         resp = resp.json()
         self.__download_url = resp["data"]["download_url"]
+        self._save_checkpoint(download_url=self.__download_url)
         logging.info(f"提交成功")
 
     def create_task(self) -> str:
         """开始创建转换任务"""
-        resp = requests.post(
-            API_CREATE_TASK, json={"resource": self.__download_url, "model_id": "8"}, headers=self.headers
+        self._throttle("create_task")
+        resp = self.session.post(
+            self.base_url + API_CREATE_TASK, json={"resource": self.__download_url, "model_id": "8"}, headers=self.headers
         )
         resp.raise_for_status()
         resp = resp.json()
         self.task_id = resp["data"]["task_id"]
+        self._save_checkpoint(task_id=self.task_id)
+        self._emit_queued(self.task_id)
         logging.info(f"任务已创建: {self.task_id}")
         return self.task_id
 
     def result(self, task_id: Optional[str] = None):
         """查询转换结果"""
-        resp = requests.get(API_QUERY_RESULT, params={"model_id": 7, "task_id": task_id or self.task_id}, headers=self.headers)
+        self._throttle("query")
+        resp = self.session.get(self.base_url + API_QUERY_RESULT, params={"model_id": 7, "task_id": task_id or self.task_id}, headers=self.headers)
         resp.raise_for_status()
         resp = resp.json()
+        self._emit_polling(resp["data"]["state"])
         return resp["data"]
 
     def _run(self):
+        # 上次运行中断时从断点继续：已有任务则直接轮询，已上传则跳过上传；
+        # 断点任务失败或轮询超时（任务可能已失效）时清除断点重新上传，避免每次运行都等满超时
+        if self._restore_checkpoint():
+            try:
+                return self._wait_result()
+            except (RuntimeError, KeyError, TypeError, TimeoutError, requests.exceptions.HTTPError) as e:
+                self._discard_checkpoint(e)
+        elif self.__download_url:
+            # 断点中的资源可能已过期，创建任务失败时同样重新上传
+            try:
+                self.create_task()
+                return self._wait_result()
+            except (RuntimeError, KeyError, TypeError, TimeoutError, requests.exceptions.HTTPError) as e:
+                self._discard_checkpoint(e)
         self.upload()
         self.create_task()
-        # 轮询检查任务状态
-        for _ in range(500):
-            task_resp = self.result()
-            if task_resp["state"] == 4:
-                break
-            time.sleep(1)
+        return self._wait_result()
+
+    def _wait_result(self) -> dict:
+        # 轮询检查任务状态，间隔随等待时间逐步加大
+        poller = AdaptivePoller.for_duration(self._estimate_duration())
+        try:
+            task_resp = poller.poll(self.result, self._task_finished)
+        finally:
+            self._record_poll(poller)
         logging.info(f"转换成功")
-        return json.loads(task_resp["result"])
+        return self._format_result(json.loads(task_resp["result"]))
+
+    def _restore_checkpoint(self) -> bool:
+        """读取断点，返回是否已有可直接轮询的任务"""
+        checkpoint = self._load_checkpoint()
+        self.__download_url = checkpoint.get("download_url")
+        self.task_id = checkpoint.get("task_id")
+        if self.task_id:
+            logging.info(f"从断点恢复任务: {self.task_id}")
+            self._emit_queued(self.task_id, resumed=True)
+        elif self.__download_url:
+            logging.info(f"从断点恢复已上传资源: {self.__download_url}")
+        return bool(self.task_id)
+
+    def _discard_checkpoint(self, error: BaseException) -> None:
+        """断点中的任务已失效（过期或失败），清除后重新上传"""
+        logging.warning(f"断点任务{self.task_id or self.__download_url}已失效，重新上传: {error}")
+        self._clear_checkpoint()
+        self.__download_url = None
+        self.task_id = None
+
+    def _record_poll(self, poller: AdaptivePoller) -> None:
+        self.metrics["poll_count"] = poller.poll_count
+        self.metrics["poll_seconds"] = round(poller.elapsed, 3)
+        logging.info(f"任务{self.task_id}轮询{poller.poll_count}次, 耗时{poller.elapsed:.1f}秒")
+
+    async def acreate_task(self) -> str:
+        """create_task 的异步版本"""
+        await self._athrottle("create_task")
+        client = get_async_client()
+        resp = await client.post(
+            self.base_url + API_CREATE_TASK, json={"resource": self.__download_url, "model_id": "8"}, headers=self.headers
+        )
+        resp.raise_for_status()
+        resp = resp.json()
+        self.task_id = resp["data"]["task_id"]
+        await asyncio.to_thread(self._save_checkpoint, task_id=self.task_id)
+        self._emit_queued(self.task_id)
+        logging.info(f"任务已创建: {self.task_id}")
+        return self.task_id
+
+    async def aresult(self, task_id: Optional[str] = None):
+        """result 的异步版本"""
+        await self._athrottle("query")
+        client = get_async_client()
+        resp = await client.get(self.base_url + API_QUERY_RESULT, params={"model_id": 7, "task_id": task_id or self.task_id}, headers=self.headers)
+        resp.raise_for_status()
+        resp = resp.json()
+        self._emit_polling(resp["data"]["state"])
+        return resp["data"]
+
+    async def _arun(self):
+        if await asyncio.to_thread(self._restore_checkpoint):
+            try:
+                return await self._await_result()
+            except (RuntimeError, KeyError, TypeError, TimeoutError, httpx.HTTPStatusError) as e:
+                await asyncio.to_thread(self._discard_checkpoint, e)
+        elif self.__download_url:
+            try:
+                await self.acreate_task()
+                return await self._await_result()
+            except (RuntimeError, KeyError, TypeError, TimeoutError, httpx.HTTPStatusError) as e:
+                await asyncio.to_thread(self._discard_checkpoint, e)
+        # 上传仍走连接池中的同步会话（分片并发），提交与轮询为原生异步
+        await asyncio.to_thread(self.upload)
+        await self.acreate_task()
+        return await self._await_result()
+
+    async def _await_result(self) -> dict:
+        poller = AdaptivePoller.for_duration(self._estimate_duration())
+        try:
+            task_resp = await poller.apoll(self.aresult, self._task_finished)
+        finally:
+            self._record_poll(poller)
+        logging.info(f"转换成功")
+        return self._format_result(json.loads(task_resp["result"]))
+
+    @staticmethod
+    def _task_finished(task_resp: dict) -> bool:
+        if task_resp["state"] == TASK_STATE_ERROR:
+            raise RuntimeError(f"转换失败: {task_resp.get('remark', '')}")
+        return task_resp["state"] == TASK_STATE_COMPLETE
+
+    def _get_key(self):
+        # 仅逐字模式使用单独的缓存 key，句级结果沿用原有 key
+        key = super()._get_key()
+        return f"{key}-word" if self.need_word_time_stamp else key
+
+    def _format_result(self, result: dict) -> dict:
+        """逐字模式下只保留逐字时间戳，并以平行数组存储，避免每个字一个字典"""
+        if not self.need_word_time_stamp:
+            return result
+        text, start_time, end_time = [], [], []
+        for u in result['utterances']:
+            # 没有逐字信息的句子整句作为一个词
+            for w in u.get('words') or [{'label': u['transcript'], 'start_time': u['start_time'],
+                                          'end_time': u['end_time']}]:
+                text.append(w['label'].strip())
+                start_time.append(w['start_time'])
+                end_time.append(w['end_time'])
+        return {WORDS_FIELD: {'text': text, 'start_time': start_time, 'end_time': end_time}}
 
     def _make_segments(self, resp_data: dict) -> list[ASRDataSeg]:
+        if WORDS_FIELD in resp_data:
+            words = resp_data[WORDS_FIELD]
+            return [ASRDataSeg(*w) for w in zip(words['text'], words['start_time'], words['end_time'])]
         return [ASRDataSeg(u['transcript'], u['start_time'], u['end_time']) for u in resp_data['utterances']]
 
 
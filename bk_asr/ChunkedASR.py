@@ -0,0 +1,87 @@
+import logging
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Type, Union
+
+from .ASRData import ASRData, ASRDataSeg
+from .AudioUtils import detect_silences, extract_chunk, plan_chunks
+from .BaseASR import BaseASR, STAGE_POLLING
+from .BcutASR import BcutASR
+
+# 每段的目标时长（秒）
+CHUNK_LENGTH = 600
+
+# 并行识别的分段数
+MAX_WORKERS = 4
+
+
+class ChunkedASR(BaseASR):
+    """长音频分段识别
+
+    使用 ffmpeg 检测静音并在静音处切分，各分段通过 asr_class 指定的引擎并行识别，
+    最后按分段起始时间偏移拼接为一个完整结果。
+    """
+
+    def __init__(self, audio_path: Union[str, bytes], asr_class: Type[BaseASR] = BcutASR, use_cache: bool = False,
+                 chunk_length: float = CHUNK_LENGTH, max_workers: int = MAX_WORKERS, fingerprint: bool = False,
+                 **asr_kwargs):
+        super().__init__(audio_path, use_cache=use_cache, fingerprint=fingerprint)
+        self.asr_class = asr_class
+        self.chunk_length = chunk_length
+        self.max_workers = max_workers
+        self.asr_kwargs = asr_kwargs
+
+    def _get_key(self):
+        options = ",".join(f"{k}={v}" for k, v in sorted(self.asr_kwargs.items()))
+        return f"{self.__class__.__name__}-{self.asr_class.__name__}-{self.cache_id}-{self.chunk_length}-{options}"
+
+    def _run(self) -> dict:
+        temp_path = None
+        if self._data_path is None:
+            # 内存数据先落盘，ffmpeg 需要可随机访问的输入
+            fd, temp_path = tempfile.mkstemp(suffix=".audio")
+            with os.fdopen(fd, "wb") as f:
+                f.write(self._data_bytes)
+        audio_path = temp_path or self._data_path
+        try:
+            duration, silences = detect_silences(audio_path)
+            chunks = plan_chunks(duration, silences, self.chunk_length)
+            logging.info(f"音频时长{duration:.1f}秒, 检测到{len(silences)}处静音, 切分为{len(chunks)}段")
+            if len(chunks) == 1:
+                asr_data = self.asr_class(self._data_path or self._data_bytes,
+                                          use_cache=self.use_cache, **self.asr_kwargs).run(callback=self._relay_event)
+                return self._to_resp_data([(0.0, asr_data)])
+
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                futures = [executor.submit(self._transcribe_chunk, audio_path, *chunk) for chunk in chunks]
+                for done, _ in enumerate(as_completed(futures), 1):
+                    self._emit(STAGE_POLLING, 10 + 80 * done // len(chunks), f"已完成 {done}/{len(chunks)} 段",
+                               chunks=len(chunks), done=done)
+                results = [future.result() for future in futures]
+            return self._to_resp_data([(start, asr_data) for (start, _), asr_data in zip(chunks, results)])
+        finally:
+            if temp_path:
+                os.remove(temp_path)
+
+    def _transcribe_chunk(self, audio_path: str, start: float, end: float) -> ASRData:
+        logging.info(f"开始识别分段: {start:.1f}-{end:.1f}秒")
+        chunk_binary = extract_chunk(audio_path, start, end)
+        return self.asr_class(chunk_binary, use_cache=self.use_cache, **self.asr_kwargs).run()
+
+    @staticmethod
+    def _to_resp_data(results) -> dict:
+        """拼接各分段结果，时间戳加上分段起始偏移（毫秒）"""
+        utterances = []
+        for start, asr_data in results:
+            offset = int(round(start * 1000))
+            for text, start_time, end_time in asr_data.rows():
+                utterances.append({
+                    "text": text,
+                    "start_time": start_time + offset,
+                    "end_time": end_time + offset,
+                })
+        return {"utterances": utterances}
+
+    def _make_segments(self, resp_data: dict) -> list[ASRDataSeg]:
+        return [ASRDataSeg(u['text'], u['start_time'], u['end_time']) for u in resp_data['utterances']]
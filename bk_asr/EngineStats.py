@@ -0,0 +1,130 @@
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict, Optional, Tuple
+
+# 每个引擎保留最近多少次调用的记录
+WINDOW_SIZE = 100
+
+# 计算分位数所需的最少样本数
+MIN_SAMPLES = 5
+
+# 连续失败多少次后熔断，以及熔断后多久允许试探请求（秒）
+FAILURE_THRESHOLD = 3
+CIRCUIT_COOLDOWN = 120.0
+
+
+class _EngineRecord:
+    def __init__(self, window_size: int):
+        # (耗时, 音频时长, 是否成功)
+        self.calls: Deque[Tuple[float, float, bool]] = deque(maxlen=window_size)
+        self.consecutive_failures = 0
+        self.opened_at: Optional[float] = None
+        # 半开状态下试探请求实际发出的时间，记录结果后清除
+        self.probe_started: Optional[float] = None
+
+
+class EngineStats:
+    """进程内各引擎的远程调用统计
+
+    记录每次调用的耗时、音频时长与成败，用于按分位数估算耗时、计算成功率，
+    并在连续失败达到阈值后熔断该引擎，冷却结束后允许试探请求（半开状态）。
+    """
+
+    def __init__(self, window_size: int = WINDOW_SIZE, failure_threshold: int = FAILURE_THRESHOLD,
+                 cooldown: float = CIRCUIT_COOLDOWN):
+        self._lock = threading.Lock()
+        self._window_size = window_size
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self._records: Dict[str, _EngineRecord] = {}
+
+    def _record(self, engine: str) -> _EngineRecord:
+        if engine not in self._records:
+            self._records[engine] = _EngineRecord(self._window_size)
+        return self._records[engine]
+
+    def record(self, engine: str, latency: float, duration: float) -> None:
+        """记录一次成功调用的耗时（秒）与音频时长（秒），并关闭熔断"""
+        with self._lock:
+            record = self._record(engine)
+            record.calls.append((latency, max(duration, 1.0), True))
+            record.consecutive_failures = 0
+            record.opened_at = None
+            record.probe_started = None
+
+    def record_failure(self, engine: str, latency: float, duration: float) -> None:
+        """记录一次失败调用，连续失败达到阈值（或半开试探失败）时熔断"""
+        with self._lock:
+            record = self._record(engine)
+            record.calls.append((latency, max(duration, 1.0), False))
+            record.consecutive_failures += 1
+            record.probe_started = None
+            if record.consecutive_failures >= self.failure_threshold:
+                record.opened_at = time.monotonic()
+
+    def is_available(self, engine: str) -> bool:
+        """熔断未打开，或冷却时间已过（允许试探）时返回 True"""
+        with self._lock:
+            record = self._records.get(engine)
+            if record is None or record.opened_at is None:
+                return True
+            return time.monotonic() - record.opened_at >= self.cooldown
+
+    def allow_request(self, engine: str) -> bool:
+        """判断是否可以向引擎发送请求；熔断冷却结束后（半开状态）只在没有进行中的试探请求时放行
+
+        放行本身不占用试探名额（请求可能命中缓存而不会发往引擎），名额在 start_request 时占用。
+        """
+        with self._lock:
+            record = self._records.get(engine)
+            if record is None or record.opened_at is None:
+                return True
+            now = time.monotonic()
+            if now - record.opened_at < self.cooldown:
+                return False
+            # 试探请求超过冷却时间仍未记录结果（如被放弃）时允许再次试探
+            return record.probe_started is None or now - record.probe_started >= self.cooldown
+
+    def start_request(self, engine: str) -> None:
+        """请求实际发往引擎时调用，半开状态下占用试探名额，直到记录该请求的结果"""
+        with self._lock:
+            record = self._records.get(engine)
+            if record is not None and record.opened_at is not None:
+                record.probe_started = time.monotonic()
+
+    def success_rate(self, engine: str) -> Optional[float]:
+        with self._lock:
+            calls = list(self._records[engine].calls) if engine in self._records else []
+        if not calls:
+            return None
+        return sum(1 for _, _, success in calls if success) / len(calls)
+
+    def latency_percentile(self, engine: str, percentile: float, duration: float) -> Optional[float]:
+        """按成功调用“耗时/音频时长”的分位数估算处理 duration 秒音频的耗时，样本不足时返回 None"""
+        with self._lock:
+            calls = list(self._records[engine].calls) if engine in self._records else []
+        ratios = sorted(latency / call_duration for latency, call_duration, success in calls if success)
+        if len(ratios) < MIN_SAMPLES:
+            return None
+        index = min(len(ratios) - 1, int(percentile * len(ratios)))
+        return ratios[index] * max(duration, 1.0)
+
+    def snapshot(self, engine: str) -> dict:
+        """返回引擎的健康状况摘要，p50/p95 为每秒音频的处理耗时（秒）"""
+        return {
+            "available": self.is_available(engine),
+            "success_rate": self.success_rate(engine),
+            "p50": self.latency_percentile(engine, 0.5, 1.0),
+            "p95": self.latency_percentile(engine, 0.95, 1.0),
+        }
+
+    def reset(self, engine: Optional[str] = None) -> None:
+        with self._lock:
+            if engine is None:
+                self._records.clear()
+            else:
+                self._records.pop(engine, None)
+
+
+engine_stats = EngineStats()
@@ -0,0 +1,357 @@
+import json
+import math
+import random
+import threading
+import time
+import uuid
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+from .BaseASR import ESTIMATED_BITRATE
+from .BcutASR import BcutASR, API_COMMIT_UPLOAD, API_CREATE_TASK, API_QUERY_RESULT, API_REQ_UPLOAD
+from .JianYingASR import JianYingASR
+from .KuaiShouASR import KuaiShouASR, API_SUBTITLE_GENERATE
+
+# 各接口在模拟服务中的路径前缀
+BCUT_PREFIX = "/x/bcut/rubick-interface"
+BCUT_UPLOAD_PREFIX = BCUT_PREFIX + "/upload/"
+JIANYING_SIGN_PATH = "/sign"
+JIANYING_VOD_PATH = "/vod/"
+JIANYING_UPLOAD_PREFIX = "/upload/"
+
+# Bcut 申请上传时返回的分片大小
+BCUT_PART_SIZE = 2 * 1024 * 1024
+
+# Bcut 任务状态：排队中、处理中、完成
+BCUT_STATE_QUEUED = 0
+BCUT_STATE_RUNNING = 1
+BCUT_STATE_COMPLETE = 4
+
+# 模拟结果中每个分段的时长（毫秒）
+SEGMENT_MS = 5000
+
+Route = Callable[[dict, bytes], Tuple[dict, Dict[str, str]]]
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def do_PUT(self):
+        self._dispatch("PUT")
+
+    def log_message(self, format, *args):
+        pass
+
+    def _read_body(self) -> bytes:
+        if self.headers.get("Transfer-Encoding", "").lower() == "chunked":
+            chunks = []
+            while True:
+                size = int(self.rfile.readline().split(b";")[0].strip(), 16)
+                if size == 0:
+                    self.rfile.readline()
+                    break
+                chunks.append(self.rfile.read(size))
+                self.rfile.readline()
+            return b"".join(chunks)
+        return self.rfile.read(int(self.headers.get("Content-Length") or 0))
+
+    def _dispatch(self, method: str):
+        fake: "FakeASRServer" = self.server.fake
+        url = urlparse(self.path)
+        body = self._read_body()
+        route = fake._route(method, url.path)
+        fake._record(route.__name__.lstrip("_") if route else f"{method} {url.path}", len(body))
+        if fake.latency:
+            time.sleep(fake.latency)
+        if route is None:
+            self._send({"code": 404, "message": "not found"}, 404)
+        elif fake._should_fail():
+            self._send({"code": 500, "message": "injected failure"}, 500)
+        else:
+            payload, headers = route({"path": url.path, "query": parse_qs(url.query)}, body)
+            self._send(payload, 200, headers)
+
+    def _send(self, payload: dict, status: int, headers: Optional[Dict[str, str]] = None):
+        data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class FakeASRServer:
+    """本地模拟的 B/J/K 接口服务，用于离线压测与基准测试
+
+    实现 BcutASR、JianYingASR（签名、上传凭证、vod、上传、提交、查询）与 KuaiShouASR
+    实际调用的全部接口，返回格式与线上一致，识别结果为按音频时长生成的占位分段。
+
+    - latency: 每个请求的固定延迟（秒）
+    - failure_rate: 请求随机返回 HTTP 500 的概率，由 seed 决定失败序列
+    - workers: 服务端同时处理的识别任务数，超出时排队
+    - processing_time / realtime_factor: 单个任务耗时 = processing_time + 音频时长 × realtime_factor
+
+    用法::
+
+        with FakeASRServer(latency=0.05, workers=2) as server:
+            BcutASR("test.mp3").run()
+            print(server.stats())
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.0, failure_rate: float = 0.0,
+                 workers: int = 4, processing_time: float = 1.0, realtime_factor: float = 0.0, seed: int = 0):
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.workers = workers
+        self.processing_time = processing_time
+        self.realtime_factor = realtime_factor
+
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        # 每个处理槽位空闲的时间点，用于模拟排队
+        self._slots = [0.0] * max(1, workers)
+        # 资源/任务 ID -> 音频大小，任务 ID -> (开始时间, 完成时间, 大小)
+        self._resources: Dict[str, int] = {}
+        self._tasks: Dict[str, Tuple[float, float, int]] = {}
+        self._requests = Counter()
+        self._bytes_received = 0
+
+        self._httpd: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+        self._saved_attrs = []
+        self._routes: Dict[Tuple[str, str], Route] = {
+            ("POST", BCUT_PREFIX + API_REQ_UPLOAD): self._bcut_req_upload,
+            ("POST", BCUT_PREFIX + API_COMMIT_UPLOAD): self._bcut_commit_upload,
+            ("POST", BCUT_PREFIX + API_CREATE_TASK): self._bcut_create_task,
+            ("GET", BCUT_PREFIX + API_QUERY_RESULT): self._bcut_result,
+            ("POST", JIANYING_SIGN_PATH): self._jianying_sign,
+            ("POST", "/lv/v1/upload_sign"): self._jianying_upload_sign,
+            ("GET", JIANYING_VOD_PATH): self._jianying_apply_upload,
+            ("POST", "/lv/v1/audio_subtitle/submit"): self._jianying_submit,
+            ("POST", "/lv/v1/audio_subtitle/query"): self._jianying_query,
+            ("POST", API_SUBTITLE_GENERATE): self._kuaishou_generate,
+        }
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def start(self) -> "FakeASRServer":
+        self._httpd = ThreadingHTTPServer((self.host, self.port), _Handler)
+        self._httpd.daemon_threads = True
+        self._httpd.fake = self
+        self.port = self._httpd.server_address[1]
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        if self._httpd is not None:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._httpd = None
+
+    def install(self) -> None:
+        """将各引擎的接口地址指向本服务，uninstall() 恢复"""
+        overrides = [
+            (BcutASR, "base_url", self.url + BCUT_PREFIX),
+            (JianYingASR, "base_url", self.url),
+            (JianYingASR, "sign_url", self.url + JIANYING_SIGN_PATH),
+            (JianYingASR, "vod_url", self.url + JIANYING_VOD_PATH),
+            (JianYingASR, "upload_scheme", "http"),
+            (KuaiShouASR, "base_url", self.url),
+        ]
+        for cls, attr, value in overrides:
+            self._saved_attrs.append((cls, attr, getattr(cls, attr)))
+            setattr(cls, attr, value)
+
+    def uninstall(self) -> None:
+        while self._saved_attrs:
+            cls, attr, value = self._saved_attrs.pop()
+            setattr(cls, attr, value)
+
+    def __enter__(self) -> "FakeASRServer":
+        self.start()
+        self.install()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.uninstall()
+        self.stop()
+
+    def stats(self) -> dict:
+        """各接口（如 bcut_upload_part）的请求次数与收到的总字节数"""
+        with self._lock:
+            return {"requests": dict(self._requests), "bytes_received": self._bytes_received}
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            self._requests.clear()
+            self._bytes_received = 0
+
+    def _route(self, method: str, path: str) -> Optional[Route]:
+        if method == "PUT" and path.startswith(BCUT_UPLOAD_PREFIX):
+            return self._bcut_upload_part
+        if path.startswith(JIANYING_UPLOAD_PREFIX):
+            return self._jianying_upload_part if method == "PUT" else self._jianying_upload_check
+        return self._routes.get((method, path))
+
+    def _record(self, endpoint: str, size: int) -> None:
+        with self._lock:
+            self._requests[endpoint] += 1
+            self._bytes_received += size
+
+    def _should_fail(self) -> bool:
+        if not self.failure_rate:
+            return False
+        with self._lock:
+            return self._random.random() < self.failure_rate
+
+    # 任务排队与结果生成
+
+    @staticmethod
+    def _duration(size: int) -> float:
+        return size * 8 / ESTIMATED_BITRATE
+
+    def _schedule(self, size: int) -> str:
+        """按最早空闲的处理槽位安排任务，返回任务 ID"""
+        task_id = uuid.uuid4().hex
+        with self._lock:
+            slot = min(range(len(self._slots)), key=self._slots.__getitem__)
+            start = max(time.monotonic(), self._slots[slot])
+            finish = start + self.processing_time + self._duration(size) * self.realtime_factor
+            self._slots[slot] = finish
+            self._tasks[task_id] = (start, finish, size)
+        return task_id
+
+    def _wait_task(self, task_id: str) -> int:
+        """阻塞到任务完成（用于同步返回结果的接口），返回音频大小"""
+        _, finish, size = self._tasks[task_id]
+        delay = finish - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        return size
+
+    def _segments(self, size: int):
+        total_ms = max(1, int(self._duration(size) * 1000))
+        for i in range(max(1, math.ceil(total_ms / SEGMENT_MS))):
+            start = i * SEGMENT_MS
+            yield f"模拟分段{i + 1}", start, min(start + SEGMENT_MS, total_ms)
+
+    @staticmethod
+    def _words(text: str, start: int, end: int):
+        """将分段按字均分为逐字时间戳"""
+        step = (end - start) / len(text)
+        for i, char in enumerate(text):
+            yield char, start + int(i * step), start + int((i + 1) * step)
+
+    # BcutASR
+
+    def _bcut_req_upload(self, request: dict, body: bytes):
+        size = json.loads(body)["size"]
+        resource_id = uuid.uuid4().hex
+        with self._lock:
+            self._resources[resource_id] = size
+        clips = max(1, math.ceil(size / BCUT_PART_SIZE))
+        return {"code": 0, "data": {
+            "in_boss_key": f"fake/{resource_id}",
+            "resource_id": resource_id,
+            "upload_id": resource_id,
+            "upload_urls": [f"{self.url}{BCUT_UPLOAD_PREFIX}{resource_id}/{i}" for i in range(clips)],
+            "per_size": BCUT_PART_SIZE,
+            "size": size,
+        }}, {}
+
+    def _bcut_upload_part(self, request: dict, body: bytes):
+        return {}, {"Etag": uuid.uuid4().hex}
+
+    def _bcut_commit_upload(self, request: dict, body: bytes):
+        resource_id = json.loads(body)["ResourceId"]
+        return {"code": 0, "data": {"download_url": f"{self.url}/resource/{resource_id}"}}, {}
+
+    def _bcut_create_task(self, request: dict, body: bytes):
+        resource_id = json.loads(body)["resource"].rsplit("/", 1)[-1]
+        if resource_id not in self._resources:
+            return {"code": 400, "message": "resource not found", "data": None}, {}
+        task_id = self._schedule(self._resources[resource_id])
+        return {"code": 0, "data": {"resource": resource_id, "task_id": task_id}}, {}
+
+    def _bcut_result(self, request: dict, body: bytes):
+        task_id = request["query"]["task_id"][0]
+        if task_id not in self._tasks:
+            return {"code": 0, "data": {"task_id": task_id, "state": 3, "remark": "task not found"}}, {}
+        start, finish, size = self._tasks[task_id]
+        now = time.monotonic()
+        if now < finish:
+            state = BCUT_STATE_QUEUED if now < start else BCUT_STATE_RUNNING
+            return {"code": 0, "data": {"task_id": task_id, "state": state, "result": ""}}, {}
+        utterances = [{"transcript": text, "start_time": s, "end_time": e,
+                       "words": [{"label": w, "start_time": ws, "end_time": we, "confidence": 1}
+                                 for w, ws, we in self._words(text, s, e)]}
+                      for text, s, e in self._segments(size)]
+        result = json.dumps({"utterances": utterances}, ensure_ascii=False)
+        return {"code": 0, "data": {"task_id": task_id, "state": BCUT_STATE_COMPLETE, "result": result}}, {}
+
+    # JianYingASR
+
+    def _jianying_sign(self, request: dict, body: bytes):
+        return {"sign": uuid.uuid4().hex}, {}
+
+    def _jianying_upload_sign(self, request: dict, body: bytes):
+        return {"ret": "0", "data": {
+            "access_key_id": "FAKEACCESSKEY",
+            "secret_access_key": "fake-secret",
+            "session_token": "fake-token",
+        }}, {}
+
+    def _jianying_apply_upload(self, request: dict, body: bytes):
+        size = int(request["query"].get("FileSize", ["0"])[0])
+        upload_id = uuid.uuid4().hex
+        with self._lock:
+            self._resources[upload_id] = size
+        return {"Result": {"UploadAddress": {
+            "StoreInfos": [{"StoreUri": f"upload/{upload_id}", "Auth": "fake-auth", "UploadID": upload_id}],
+            "UploadHosts": [f"{self.host}:{self.port}"],
+            "SessionKey": "fake-session",
+        }}}, {}
+
+    def _jianying_upload_part(self, request: dict, body: bytes):
+        return {"success": 0}, {}
+
+    def _jianying_upload_check(self, request: dict, body: bytes):
+        return {"success": 0}, {}
+
+    def _jianying_submit(self, request: dict, body: bytes):
+        upload_id = json.loads(body)["audio"].rsplit("/", 1)[-1]
+        task_id = self._schedule(self._resources.get(upload_id, 0))
+        return {"ret": "0", "data": {"id": task_id}}, {}
+
+    def _jianying_query(self, request: dict, body: bytes):
+        task_id = json.loads(body)["id"]
+        if task_id not in self._tasks:
+            return {"ret": "1", "errmsg": "task not found", "data": None}, {}
+        size = self._wait_task(task_id)
+        utterances = [{"text": text, "start_time": s, "end_time": e,
+                       "words": [{"text": w, "start_time": ws, "end_time": we} for w, ws, we in self._words(text, s, e)]}
+                      for text, s, e in self._segments(size)]
+        return {"ret": "0", "data": {"utterances": utterances}}, {}
+
+    # KuaiShouASR
+
+    def _kuaishou_generate(self, request: dict, body: bytes):
+        size = len(body)
+        self._wait_task(self._schedule(size))
+        text = [{"text": text, "start_time": s, "end_time": e} for text, s, e in self._segments(size)]
+        return {"data": {"text": text}}, {}
@@ -0,0 +1,121 @@
+import logging
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Callable, Dict, List, Sequence, Type, Union
+
+from .ASRData import ASRDataSeg
+from .BaseASR import ASREvent, BaseASR, SEGMENTS_CACHE_FIELD
+from .BcutASR import BcutASR
+from .EngineStats import engine_stats
+from .JianYingASR import JianYingASR
+from .KuaiShouASR import KuaiShouASR
+
+# 默认参与竞速的引擎，按优先级排列
+DEFAULT_ENGINES = (BcutASR, JianYingASR, KuaiShouASR)
+
+# 主引擎超过该分位数耗时仍未完成时启动备用引擎
+HEDGE_PERCENTILE = 0.9
+
+# 历史样本不足时的对冲等待时间（秒），以及对冲等待的下限
+DEFAULT_HEDGE_DELAY = 60.0
+MIN_HEDGE_DELAY = 5.0
+
+
+class HedgedASR(BaseASR):
+    """多引擎对冲识别
+
+    先启动第一个引擎，若其在历史耗时分位数内未完成（或直接失败），依次启动后续引擎，
+    返回最先成功的结果，其余引擎的结果被忽略；结果会写入每个参与引擎的缓存 key。
+    """
+    PREPARE_BEFORE_RUN = False
+
+    def __init__(self, audio_path: Union[str, bytes], asr_classes: Sequence[Type[BaseASR]] = DEFAULT_ENGINES,
+                 use_cache: bool = False, hedge_percentile: float = HEDGE_PERCENTILE, transcode: bool = False,
+                 fingerprint: bool = False):
+        # 转码在此完成一次，各参与引擎直接使用转码后的音频
+        super().__init__(audio_path, use_cache=use_cache, transcode=transcode, fingerprint=fingerprint)
+        assert asr_classes, "asr_classes must not be empty"
+        self.asr_classes = list(asr_classes)
+        self.hedge_percentile = hedge_percentile
+        self.engines: List[BaseASR] = []
+        self.winner = None
+
+    def _get_key(self):
+        names = "+".join(asr_class.__name__ for asr_class in self.asr_classes)
+        return f"{self.__class__.__name__}-{names}-{self.cache_id}"
+
+    def _hedge_delay(self, asr_class: Type[BaseASR]) -> float:
+        delay = engine_stats.latency_percentile(asr_class.__name__, self.hedge_percentile, self._estimate_duration())
+        if delay is None:
+            return DEFAULT_HEDGE_DELAY
+        return max(MIN_HEDGE_DELAY, delay)
+
+    def _run(self) -> dict:
+        self.engines = [self._sub_engine(asr_class) for asr_class in self.asr_classes]
+        # 任一参与引擎已有缓存时直接使用
+        cached = self._cached_result(self.engines)
+        if cached is not None:
+            return cached
+
+        # 子引擎在各自运行前取用这里准备好的上传数据
+        self._prepare_upload()
+
+        executor = ThreadPoolExecutor(max_workers=len(self.engines))
+        pending: Dict[Future, BaseASR] = {}
+        next_index = 0
+        start_next = True
+        last_error = None
+        try:
+            while True:
+                if start_next and next_index < len(self.engines):
+                    engine = self.engines[next_index]
+                    logging.info(f"启动引擎: {engine.__class__.__name__}")
+                    pending[executor.submit(engine.run, callback=self._relay_from(engine))] = engine
+                    next_index += 1
+                start_next = False
+                if not pending:
+                    break
+                timeout = None
+                if next_index < len(self.engines):
+                    timeout = self._hedge_delay(self.engines[next_index - 1].__class__)
+                done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+                if not done:
+                    logging.info(f"引擎在{timeout:.1f}秒内未完成，启动备用引擎")
+                    start_next = True
+                    continue
+                for future in done:
+                    engine = pending.pop(future)
+                    try:
+                        asr_data = future.result()
+                    except (Exception, SystemExit) as e:
+                        logging.warning(f"引擎 {engine.__class__.__name__} 失败: {e}")
+                        last_error = e
+                        start_next = True
+                        continue
+                    self.winner = engine
+                    logging.info(f"引擎 {engine.__class__.__name__} 率先完成")
+                    return self._share_result(asr_data)
+        finally:
+            # 未启动的引擎直接取消；正在运行的引擎无法中断，标记为放弃后其结果与事件均被忽略，
+            # 它们持有本实例的引用，转码临时文件在其结束后才会删除
+            for engine in pending.values():
+                engine._abandoned = True
+            executor.shutdown(wait=False, cancel_futures=True)
+        raise RuntimeError(f"所有引擎均识别失败: {last_error}")
+
+    def _relay_from(self, engine: BaseASR) -> Callable[[ASREvent], None]:
+        """转发子引擎的进度事件，引擎被放弃后不再转发"""
+        def relay(event: ASREvent) -> None:
+            if not engine._abandoned:
+                self._relay_event(event)
+        return relay
+
+    def _share_result(self, asr_data) -> dict:
+        entry = self.segments_cache_entry(asr_data)
+        if self.use_cache:
+            for engine in self.engines:
+                if engine is not self.winner and engine._get_key() not in self.cache:
+                    self.cache.set(engine._get_key(), entry)
+        return entry
+
+    def _make_segments(self, resp_data: dict) -> list[ASRDataSeg]:
+        return [ASRDataSeg(*seg) for seg in resp_data[SEGMENTS_CACHE_FIELD]]
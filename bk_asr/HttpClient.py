@@ -0,0 +1,110 @@
+import asyncio
+import os
+import threading
+import weakref
+from typing import BinaryIO, Dict, List
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+
+# 缓存的主机连接池数量（各引擎访问的主机总数不超过这个值）
+POOL_CONNECTIONS = 20
+
+# 每个主机保持的长连接数，默认对应 GUI 3 个工作线程 x 每个任务 4 路分片上传
+DEFAULT_POOL_SIZE = 12
+
+# 异步请求超时（秒），轮询与上传请求都不应无限等待
+ASYNC_TIMEOUT = 60.0
+
+_session = None
+_pool_size = DEFAULT_POOL_SIZE
+_lock = threading.Lock()
+# httpx.AsyncClient 绑定事件循环，每个事件循环各自持有一个
+_async_clients = weakref.WeakKeyDictionary()
+
+
+def _mount_adapters(session: requests.Session, pool_size: int) -> None:
+    adapter = HTTPAdapter(pool_connections=POOL_CONNECTIONS, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+
+
+def get_session() -> requests.Session:
+    """获取所有引擎共享的 HTTP 会话
+
+    会话按主机维护 keep-alive 连接池，可在多个线程中同时使用，
+    避免每次请求都重新进行 TCP+TLS 握手。
+    """
+    global _session
+    with _lock:
+        if _session is None:
+            _session = requests.Session()
+            _mount_adapters(_session, _pool_size)
+        return _session
+
+
+def set_pool_size(pool_size: int) -> None:
+    """设置每个主机的最大长连接数，通常与并发任务数保持一致"""
+    global _pool_size
+    with _lock:
+        _pool_size = max(1, pool_size)
+        if _session is not None:
+            _mount_adapters(_session, _pool_size)
+
+
+def get_async_client() -> httpx.AsyncClient:
+    """获取当前事件循环共享的异步 HTTP 客户端"""
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None or client.is_closed:
+        limits = httpx.Limits(max_connections=None, max_keepalive_connections=_pool_size)
+        client = httpx.AsyncClient(limits=limits, timeout=ASYNC_TIMEOUT)
+        _async_clients[loop] = client
+    return client
+
+
+class MultipartStream:
+    """流式 multipart/form-data 请求体
+
+    requests 处理 files= 参数时会把文件整个读入内存再拼接请求体；
+    本类按需从文件对象读取，并提供长度以便发送 Content-Length，
+    作为 data= 传给 requests 即可边读边上传。
+    """
+
+    def __init__(self, fields: Dict[str, str], name: str, filename: str, fileobj: BinaryIO, size: int,
+                 content_type: str = "application/octet-stream"):
+        boundary = os.urandom(16).hex()
+        self.content_type = f"multipart/form-data; boundary={boundary}"
+        head = b"".join(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{key}"\r\n\r\n{value}\r\n'.encode()
+            for key, value in fields.items()
+        )
+        head += (f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"; filename="{filename}"\r\n'
+                 f'Content-Type: {content_type}\r\n\r\n').encode()
+        tail = f"\r\n--{boundary}--\r\n".encode()
+        self._parts: List = [head, fileobj, tail]
+        self._length = len(head) + size + len(tail)
+
+    def __len__(self) -> int:
+        return self._length
+
+    def read(self, size: int = -1) -> bytes:
+        chunks = []
+        while self._parts and size != 0:
+            part = self._parts[0]
+            if isinstance(part, bytes):
+                chunk = part if size < 0 else part[:size]
+                rest = part[len(chunk):]
+                if rest:
+                    self._parts[0] = rest
+                else:
+                    self._parts.pop(0)
+            else:
+                chunk = part.read(size)
+                if not chunk or size < 0:
+                    self._parts.pop(0)
+            chunks.append(chunk)
+            if size > 0:
+                size -= len(chunk)
+        return b"".join(chunks)
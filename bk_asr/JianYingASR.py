@@ -1,25 +1,54 @@
+import asyncio
 import datetime
 import hashlib
 import hmac
 import json
-import os
+import logging
 import time
 import uuid
+import zlib
 from typing import Dict, Tuple, Union
 
+import httpx
 import requests
 
 from .ASRData import ASRDataSeg
 from .BaseASR import BaseASR
+from .HttpClient import get_async_client
+from .TTLCache import TTLCache
 
 
 # from ASRData import ASRDataSeg
 # from BaseASR import BaseASR
 
+LV_API_BASE_URL = "https://lv-pc-api-sinfonlinec.ulikecam.com"
+SIGN_URL = "https://asrtools-update.bkfeng.top/sign"
+VOD_API_URL = "https://vod.bytedanceapi.com/"
+
+# 签名与上传 STS 凭证的缓存时间（秒），进程内所有任务共享
+SIGN_TTL = 60
+STS_TTL = 600
+_credential_cache = TTLCache()
+
+# lv 接口拒绝签名时返回的 HTTP 状态码，只有签名被拒绝时才换新签名重试
+SIGN_REJECTED_STATUS = (401, 403)
+
+# 查询请求在识别完成后才返回，查询的超时时间（秒）需要覆盖整个识别过程
+QUERY_TIMEOUT = 600.0
+
+# 超过该大小的文件按分片上传
+UPLOAD_PART_SIZE = 10 * 1024 * 1024
+
 class JianYingASR(BaseASR):
+    # Service endpoints; point them at a local stand-in (see FakeServer) for offline runs
+    base_url = LV_API_BASE_URL
+    sign_url = SIGN_URL
+    vod_url = VOD_API_URL
+    upload_scheme = "https"
+
     def __init__(self, audio_path: Union[str, bytes], use_cache: bool = False, need_word_time_stamp: bool = False,
-                 start_time: float = 0, end_time: float = 6000):
-        super().__init__(audio_path, use_cache)
+                 start_time: float = 0, end_time: float = 6000, transcode: bool = False, fingerprint: bool = False):
+        super().__init__(audio_path, use_cache, transcode, fingerprint)
         self.audio_path = audio_path
         self.end_time = end_time
         self.start_time = start_time
@@ -35,14 +64,13 @@ class JianYingASR(BaseASR):
         self.upload_id = None
         self.session_key = None
         self.upload_hosts = None
+        self.part_crcs = []
 
         self.need_word_time_stamp = need_word_time_stamp
         self.tdid = "3943278516897751" if datetime.datetime.now().year != 2024 else f"{uuid.getnode():012d}"
 
-    def submit(self) -> str:
-        """Submit the task"""
-        url = "https://lv-pc-api-sinfonlinec.ulikecam.com/lv/v1/audio_subtitle/submit"
-        payload = {
+    def _submit_payload(self) -> dict:
+        return {
             "adjust_endtime": 200,
             "audio": self.store_uri,
             "caption_type": 2,
@@ -52,13 +80,17 @@ class JianYingASR(BaseASR):
             "words_per_line": 16
         }
 
-        sign, device_time = self._generate_sign_parameters(url='/lv/v1/audio_subtitle/submit', pf='4', appvr='4.0.0',
-                                                           tdid=self.tdid)
-        headers = self._build_headers(device_time, sign)
-        response = requests.post(url, json=payload, headers=headers)
+    def submit(self) -> str:
+        """Submit the task"""
+        response = self._signed_post('/lv/v1/audio_subtitle/submit', 'submit', json=self._submit_payload())
         query_id = response.json()['data']['id']
         return query_id
 
+    async def asubmit(self) -> str:
+        """Async version of submit"""
+        response = await self._asigned_post('/lv/v1/audio_subtitle/submit', 'submit', json=self._submit_payload())
+        return response.json()['data']['id']
+
     def upload(self):
         """Upload the file"""
         self._upload_sign()
@@ -70,32 +102,105 @@ class JianYingASR(BaseASR):
 
     def query(self, query_id: str):
         """Query the task"""
-        url = "https://lv-pc-api-sinfonlinec.ulikecam.com/lv/v1/audio_subtitle/query"
         payload = {
             "id": query_id,
             "pack_options": {"need_attribute": True}
         }
-        sign, device_time = self._generate_sign_parameters(url='/lv/v1/audio_subtitle/query', pf='4', appvr='4.0.0',
-                                                           tdid=self.tdid)
-        headers = self._build_headers(device_time, sign)
-        response = requests.post(url, json=payload, headers=headers)
+        self._emit_polling()
+        response = self._signed_post('/lv/v1/audio_subtitle/query', 'query', json=payload, timeout=QUERY_TIMEOUT)
         return response.json()
 
-    def _run(self, callback=None):
-        # logging.info("正在上传文件...")
-        if callback:
-            callback(20, "正在上传...")
-        self.upload()
-        if callback:
-            callback(50, "提交任务...")
-        query_id = self.submit()
-        if callback:
-            callback(60, "获取结果...")
+    async def aquery(self, query_id: str):
+        """Async version of query; the server holds the request until recognition finishes"""
+        payload = {
+            "id": query_id,
+            "pack_options": {"need_attribute": True}
+        }
+        self._emit_polling()
+        response = await self._asigned_post('/lv/v1/audio_subtitle/query', 'query', json=payload,
+                                            timeout=QUERY_TIMEOUT)
+        return response.json()
+
+    def _run(self):
+        # 上次运行中断时从断点继续：已提交的任务直接查询，已上传的音频直接提交
+        checkpoint = self._load_checkpoint()
+        query_id = checkpoint.get("query_id")
+        if query_id:
+            logging.info(f"从断点恢复任务: {query_id}")
+            self._emit_queued(query_id, resumed=True)
+            try:
+                resp_data = self.query(query_id)
+            except requests.exceptions.Timeout as e:
+                # 断点任务可能已失效，不再等待
+                resp_data = {'errmsg': e}
+            if resp_data.get('data'):
+                return resp_data
+            self._discard_checkpoint(resp_data.get('errmsg', 'empty result'))
+            query_id = None
+        elif checkpoint.get("store_uri"):
+            logging.info(f"从断点恢复已上传音频: {checkpoint['store_uri']}")
+            self.store_uri = checkpoint["store_uri"]
+            try:
+                query_id = self.submit()
+            except (KeyError, TypeError) as e:
+                self._discard_checkpoint(e)
+                query_id = None
+
+        if not query_id:
+            self.upload()
+            self._save_checkpoint(store_uri=self.store_uri)
+            query_id = self.submit()
+        self._save_checkpoint(query_id=query_id)
+        self._emit_queued(query_id)
         resp_data = self.query(query_id)
-        if callback:
-            callback(100, "转录完成")
+        if not resp_data.get('data'):
+            # 错误响应不能写入缓存，任务也无法继续查询
+            self._clear_checkpoint()
+            raise RuntimeError(f"识别失败: {resp_data.get('errmsg', resp_data)}")
+        return resp_data
+
+    async def _arun(self):
+        # 与 _run 流程相同；上传仍走同步会话，提交与查询（耗时最长）为原生异步
+        checkpoint = await asyncio.to_thread(self._load_checkpoint)
+        query_id = checkpoint.get("query_id")
+        if query_id:
+            logging.info(f"从断点恢复任务: {query_id}")
+            self._emit_queued(query_id, resumed=True)
+            try:
+                resp_data = await self.aquery(query_id)
+            except httpx.TimeoutException as e:
+                resp_data = {'errmsg': e}
+            if resp_data.get('data'):
+                return resp_data
+            await asyncio.to_thread(self._discard_checkpoint, resp_data.get('errmsg', 'empty result'))
+            query_id = None
+        elif checkpoint.get("store_uri"):
+            logging.info(f"从断点恢复已上传音频: {checkpoint['store_uri']}")
+            self.store_uri = checkpoint["store_uri"]
+            try:
+                query_id = await self.asubmit()
+            except (KeyError, TypeError) as e:
+                await asyncio.to_thread(self._discard_checkpoint, e)
+                query_id = None
+
+        if not query_id:
+            await asyncio.to_thread(self.upload)
+            await asyncio.to_thread(self._save_checkpoint, store_uri=self.store_uri)
+            query_id = await self.asubmit()
+        await asyncio.to_thread(self._save_checkpoint, query_id=query_id)
+        self._emit_queued(query_id)
+        resp_data = await self.aquery(query_id)
+        if not resp_data.get('data'):
+            await asyncio.to_thread(self._clear_checkpoint)
+            raise RuntimeError(f"识别失败: {resp_data.get('errmsg', resp_data)}")
         return resp_data
 
+    def _discard_checkpoint(self, error) -> None:
+        """The checkpointed upload or task has expired on the server; start over"""
+        logging.warning(f"断点已失效，重新上传: {error}")
+        self._clear_checkpoint()
+        self.store_uri = None
+
     def _make_segments(self, resp_data: dict) -> list[ASRDataSeg]:
         if self.need_word_time_stamp:
             return [ASRDataSeg(w['text'].strip(), w['start_time'], w['end_time']) for u in
@@ -104,10 +209,49 @@ class JianYingASR(BaseASR):
             return [ASRDataSeg(u['text'], u['start_time'], u['end_time']) for u in resp_data['data']['utterances']]
 
     def _get_key(self):
-        return f"{self.__class__.__name__}-{self.crc32_hex}-{self.need_word_time_stamp}"
+        return f"{self.__class__.__name__}-{self.cache_id}-{self.need_word_time_stamp}"
 
     def _generate_sign_parameters(self, url: str, pf: str = '4', appvr: str = '4.0.0', tdid='') -> \
             Tuple[str, str]:
+        """Generate signature and timestamp, reusing a process-wide cached one until SIGN_TTL expires"""
+        return _credential_cache.get_or_create(
+            ("sign", url, pf, appvr, self.tdid),
+            lambda: self._request_sign(url, pf, appvr),
+            SIGN_TTL
+        )
+
+    def _signed_post(self, path: str, endpoint: str, **kwargs) -> requests.Response:
+        """POST to the lv API with sign headers; retry once with a fresh sign only if the cached one is rejected.
+
+        A rejected request was never processed, so resending it cannot create a second task. Any other
+        failure is returned as is: submit is not idempotent and the sign itself is still valid.
+        """
+        for _ in range(2):
+            sign, device_time = self._generate_sign_parameters(url=path, pf='4', appvr='4.0.0', tdid=self.tdid)
+            headers = self._build_headers(device_time, sign)
+            self._throttle(endpoint)
+            response = self.session.post(self.base_url + path, headers=headers, **kwargs)
+            if not _sign_rejected(response):
+                break
+            _credential_cache.invalidate(("sign", path, '4', '4.0.0', self.tdid))
+        return response
+
+    async def _asigned_post(self, path: str, endpoint: str, **kwargs) -> httpx.Response:
+        """Async version of _signed_post; a sign cache miss is fetched in a worker thread"""
+        client = get_async_client()
+        for _ in range(2):
+            sign, device_time = await asyncio.to_thread(
+                self._generate_sign_parameters, url=path, pf='4', appvr='4.0.0', tdid=self.tdid
+            )
+            headers = self._build_headers(device_time, sign)
+            await self._athrottle(endpoint)
+            response = await client.post(self.base_url + path, headers=headers, **kwargs)
+            if not _sign_rejected(response):
+                break
+            _credential_cache.invalidate(("sign", path, '4', '4.0.0', self.tdid))
+        return response
+
+    def _request_sign(self, url: str, pf: str, appvr: str) -> Tuple[str, str]:
         """Generate signature and timestamp via an HTTP request"""
         current_time = str(int(time.time()))
         data = {
@@ -117,19 +261,18 @@ class JianYingASR(BaseASR):
             'appvr': appvr,
             'tdid': self.tdid
         }
-        # Replace with your actual endpoint URL
-        get_sign_url = 'https://asrtools-update.bkfeng.top/sign'
+        self._throttle("sign")
         try:
-            response = requests.post(get_sign_url, json=data)
+            response = self.session.post(self.sign_url, json=data)
             response.raise_for_status()
             response_data = response.json()
             sign = response_data.get('sign')
             if not sign:
                 raise ValueError("No 'sign' in response")
         except requests.exceptions.RequestException as e:
-            raise SystemExit(f"HTTP Request failed: {e}")
+            raise RuntimeError(f"HTTP Request failed: {e}") from e
         except ValueError as ve:
-            raise SystemExit(f"Invalid response: {ve}")
+            raise RuntimeError(f"Invalid response: {ve}") from ve
         return sign.lower(), current_time
 
     def _build_headers(self, device_time: str, sign: str) -> Dict[str, str]:
@@ -144,36 +287,34 @@ class JianYingASR(BaseASR):
             'tdid': self.tdid,
         }
 
-    def _uplosd_headers(self):
+    def _uplosd_headers(self, crc32_hex: str = None):
         headers = {
             'User-Agent': "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/81.0.4044.138 Safari/537.36 Thea/1.0.1",
             'Authorization': self.auth,
-            'Content-CRC32': self.crc32_hex,
+            'Content-CRC32': crc32_hex or self.crc32_hex,
         }
         return headers
 
     def _upload_sign(self):
-        """Get upload sign"""
-        url = "https://lv-pc-api-sinfonlinec.ulikecam.com/lv/v1/upload_sign"
+        """Get upload sign, shared between jobs until STS_TTL expires"""
+        self.access_key, self.secret_key, self.session_token = _credential_cache.get_or_create(
+            ("sts", self.tdid), self._request_upload_credentials, STS_TTL
+        )
+        return self.access_key, self.secret_key, self.session_token
+
+    def _request_upload_credentials(self) -> Tuple[str, str, str]:
+        """Fetch fresh STS credentials for uploading"""
         payload = json.dumps({"biz": "pc-recognition"})
-        sign, device_time = self._generate_sign_parameters(url='/lv/v1/upload_sign', pf='4', appvr='4.0.0',
-                                                           tdid=self.tdid)
-        headers = self._build_headers(device_time, sign)
-        response = requests.post(url, data=payload, headers=headers)
+        response = self._signed_post('/lv/v1/upload_sign', 'upload', data=payload)
         response.raise_for_status()
         login_data = response.json()
-        self.access_key = login_data['data']['access_key_id']
-        self.secret_key = login_data['data']['secret_access_key']
-        self.session_token = login_data['data']['session_token']
-        return self.access_key, self.secret_key, self.session_token
+        return (login_data['data']['access_key_id'],
+                login_data['data']['secret_access_key'],
+                login_data['data']['session_token'])
 
-    def _upload_auth(self):
+    def _upload_auth(self, retry: bool = True):
         """Get upload authorization"""
-        if isinstance(self.audio_path, bytes):
-            file_size = len(self.audio_path)
-        else:
-            file_size = os.path.getsize(self.audio_path)
-        request_parameters = f'Action=ApplyUploadInner&FileSize={file_size}&FileType=object&IsInner=1&SpaceName=lv-mac-recognition&Version=2020-11-19&s=5y0udbjapi'
+        request_parameters = f'Action=ApplyUploadInner&FileSize={self.file_size}&FileType=object&IsInner=1&SpaceName=lv-mac-recognition&Version=2020-11-19&s=5y0udbjapi'
 
         t = datetime.datetime.utcnow()
         amz_date = t.strftime('%Y%m%dT%H%M%SZ')
@@ -185,8 +326,14 @@ class JianYingASR(BaseASR):
         signature = aws_signature(self.secret_key, request_parameters, headers, region="cn", service="vod")
         authorization = f"AWS4-HMAC-SHA256 Credential={self.access_key}/{datestamp}/cn/vod/aws4_request, SignedHeaders=x-amz-date;x-amz-security-token, Signature={signature}"
         headers["authorization"] = authorization
-        response = requests.get(f"https://vod.bytedanceapi.com/?{request_parameters}", headers=headers)
+        self._throttle("upload")
+        response = self.session.get(f"{self.vod_url}?{request_parameters}", headers=headers)
         store_infos = response.json()
+        if 'Result' not in store_infos and retry:
+            # 缓存的 STS 凭证可能已失效，刷新后重试一次
+            _credential_cache.invalidate(("sts", self.tdid))
+            self._upload_sign()
+            return self._upload_auth(retry=False)
 
         self.store_uri = store_infos['Result']['UploadAddress']['StoreInfos'][0]['StoreUri']
         self.auth = store_infos['Result']['UploadAddress']['StoreInfos'][0]['Auth']
@@ -197,31 +344,52 @@ class JianYingASR(BaseASR):
         return store_infos
 
     def _upload_file(self):
-        """Upload the file"""
-        url = f"https://{self.upload_hosts}/{self.store_uri}?partNumber=1&uploadID={self.upload_id}"
-        headers = self._uplosd_headers()
-        response = requests.put(url, data=self.file_binary, headers=headers)
-        resp_data = response.json()
-        assert resp_data['success'] == 0, f"File upload failed: {response.text}"
-        return resp_data
+        """Upload the file, in parts of UPLOAD_PART_SIZE when it is large"""
+        self.part_crcs = []
+        self._start_upload()
+        part_count = max(1, -(-self.file_size // UPLOAD_PART_SIZE))
+        for part_number in range(1, part_count + 1):
+            start = (part_number - 1) * UPLOAD_PART_SIZE
+            data = self._read_range(start, min(start + UPLOAD_PART_SIZE, self.file_size))
+            try:
+                part_crc = self.crc32_hex if part_count == 1 else format(zlib.crc32(data) & 0xFFFFFFFF, '08x')
+                url = f"{self.upload_scheme}://{self.upload_hosts}/{self.store_uri}?partNumber={part_number}&uploadID={self.upload_id}"
+                headers = self._uplosd_headers(part_crc)
+                response = self.session.put(url, data=data, headers=headers)
+            finally:
+                data.release()
+            resp_data = response.json()
+            assert resp_data['success'] == 0, f"File upload failed: {response.text}"
+            self.part_crcs.append(part_crc)
+            self._add_uploaded(min(UPLOAD_PART_SIZE, self.file_size - start))
+        return self.part_crcs
 
     def _upload_check(self):
-        """Check upload result"""
-        url = f"https://{self.upload_hosts}/{self.store_uri}?uploadID={self.upload_id}"
-        payload = f"1:{self.crc32_hex}"
+        """Complete the multipart upload with the CRC32 of every part"""
+        url = f"{self.upload_scheme}://{self.upload_hosts}/{self.store_uri}?uploadID={self.upload_id}"
+        payload = ",".join(f"{i}:{crc}" for i, crc in enumerate(self.part_crcs, 1))
         headers = self._uplosd_headers()
-        response = requests.post(url, data=payload, headers=headers)
+        response = self.session.post(url, data=payload, headers=headers)
         resp_data = response.json()
         return resp_data
 
     def _upload_commit(self):
-        """Commit the uploaded file"""
-        url = f"https://{self.upload_hosts}/{self.store_uri}?uploadID={self.upload_id}&partNumber=1&x-amz-security-token={self.session_token}"
-        headers = self._uplosd_headers()
-        response = requests.put(url, data=self.file_binary, headers=headers)
+        """Commit the uploaded file by reference; the payload has already been transferred"""
         return self.store_uri
 
 
+def _sign_rejected(response: Union[requests.Response, httpx.Response]) -> bool:
+    """Whether the lv API rejected the request because of its sign (auth status, or an errmsg about the sign)"""
+    if response.status_code in SIGN_REJECTED_STATUS:
+        return True
+    try:
+        resp_data = response.json()
+    except ValueError:
+        return False
+    errmsg = resp_data.get('errmsg') if isinstance(resp_data, dict) else None
+    return isinstance(errmsg, str) and 'sign' in errmsg.lower()
+
+
 def sign(key: bytes, msg: str) -> bytes:
     """使用HMAC-SHA256生成签名"""
     return hmac.new(key, msg.encode('utf-8'), hashlib.sha256).digest()
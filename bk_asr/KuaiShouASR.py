@@ -1,16 +1,25 @@
-import requests
-
 from .ASRData import ASRDataSeg
 from .BaseASR import BaseASR
+from .HttpClient import MultipartStream, get_async_client
+
+API_BASE_URL = "https://ai.kuaishou.com"
+API_SUBTITLE_GENERATE = "/api/effects/subtitle_generate"
 
 
 class KuaiShouASR(BaseASR):
-    def __init__(self, audio_path: [str, bytes], use_cache: bool = False):
-        super().__init__(audio_path, use_cache)
+    # 接口地址，可替换为本地模拟服务（见 FakeServer）
+    base_url = API_BASE_URL
+
+    def __init__(self, audio_path: [str, bytes], use_cache: bool = False, transcode: bool = False,
+                 fingerprint: bool = False):
+        super().__init__(audio_path, use_cache, transcode, fingerprint)
 
     def _run(self) -> dict:
         return self._submit()
 
+    async def _arun(self) -> dict:
+        return await self._asubmit()
+
     def _make_segments(self, resp_data: dict) -> list[ASRDataSeg]:
         return [ASRDataSeg(u['text'], u['start_time'], u['end_time']) for u in resp_data['data']['text']]
 
@@ -18,6 +27,28 @@ class KuaiShouASR(BaseASR):
         payload = {
             "typeId": "1"
         }
-        files = [('file', ('test.mp3', self.file_binary, 'audio/mpeg'))]
-        result = requests.post("https://ai.kuaishou.com/api/effects/subtitle_generate", data=payload, files=files)
+        self._throttle("submit")
+        # 上传与识别在同一个请求中完成，该阶段耗时包含服务端识别时间
+        self._start_upload()
+        with self._open_audio() as f:
+            body = MultipartStream(payload, 'file', 'test.mp3', f, self.file_size, 'audio/mpeg')
+            result = self.session.post(self.base_url + API_SUBTITLE_GENERATE, data=body,
+                                       headers={'Content-Type': body.content_type})
+        self._add_uploaded(self.file_size)
+        result.raise_for_status()
+        return result.json()
+
+    async def _asubmit(self) -> dict:
+        payload = {
+            "typeId": "1"
+        }
+        await self._athrottle("submit")
+        self._start_upload()
+        client = get_async_client()
+        # httpx 按块读取 files 中的文件对象，本身即为流式上传
+        with self._open_audio() as f:
+            files = [('file', ('test.mp3', f, 'audio/mpeg'))]
+            result = await client.post(self.base_url + API_SUBTITLE_GENERATE, data=payload, files=files)
+        self._add_uploaded(self.file_size)
+        result.raise_for_status()
         return result.json()
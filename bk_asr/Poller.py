@@ -0,0 +1,66 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable
+
+
+class AdaptivePoller:
+    """自适应间隔的轮询器
+
+    前几次快速查询，之后按 factor 逐步放大间隔（不超过 max_interval），
+    超过 timeout 仍未完成时抛出 TimeoutError。
+    """
+
+    def __init__(self, initial_interval: float = 0.5, max_interval: float = 10.0, factor: float = 1.5,
+                 timeout: float = 600.0):
+        self.initial_interval = initial_interval
+        self.max_interval = max_interval
+        self.factor = factor
+        self.timeout = timeout
+
+        self.poll_count = 0
+        self.elapsed = 0.0
+
+    @classmethod
+    def for_duration(cls, duration: float) -> "AdaptivePoller":
+        """根据音频时长（秒）估算轮询间隔上限与超时时间"""
+        return cls(
+            max_interval=min(10.0, max(1.0, duration / 120)),
+            timeout=300.0 + duration,
+        )
+
+    def poll(self, fn: Callable[[], Any], is_done: Callable[[Any], bool]) -> Any:
+        """反复调用 fn 直到 is_done(结果) 为真，返回最后一次结果"""
+        start = time.monotonic()
+        deadline = start + self.timeout
+        interval = self.initial_interval
+        while True:
+            result = fn()
+            self.poll_count += 1
+            self.elapsed = time.monotonic() - start
+            if is_done(result):
+                return result
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutError(f"轮询超时: {self.timeout:.0f}秒内共查询{self.poll_count}次仍未完成")
+            time.sleep(min(interval, remaining))
+            interval = min(interval * self.factor, self.max_interval)
+
+    async def apoll(self, fn: Callable[[], Awaitable[Any]], is_done: Callable[[Any], bool]) -> Any:
+        """poll 的异步版本，fn 为协程函数，等待期间不占用线程"""
+        start = time.monotonic()
+        deadline = start + self.timeout
+        interval = self.initial_interval
+        while True:
+            result = await fn()
+            self.poll_count += 1
+            self.elapsed = time.monotonic() - start
+            if is_done(result):
+                return result
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutError(f"轮询超时: {self.timeout:.0f}秒内共查询{self.poll_count}次仍未完成")
+            await asyncio.sleep(min(interval, remaining))
+            interval = min(interval * self.factor, self.max_interval)
+
+    def __str__(self) -> str:
+        return f"AdaptivePoller(polls={self.poll_count}, elapsed={self.elapsed:.1f}s)"
@@ -0,0 +1,145 @@
+import asyncio
+import json
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# 跨进程共享令牌桶状态的目录
+STATE_DIR = os.path.join(tempfile.gettempdir(), "bk_asr", "ratelimit")
+
+# 各引擎接口的默认限速: (引擎, 接口) -> (每秒令牌数, 桶容量)
+DEFAULT_LIMITS: Dict[Tuple[str, str], Tuple[float, float]] = {
+    ("BcutASR", "upload"): (2.0, 5),
+    ("BcutASR", "create_task"): (1.0, 3),
+    ("BcutASR", "query"): (5.0, 10),
+    ("JianYingASR", "sign"): (5.0, 10),
+    ("JianYingASR", "upload"): (2.0, 5),
+    ("JianYingASR", "submit"): (1.0, 3),
+    ("JianYingASR", "query"): (2.0, 5),
+    ("KuaiShouASR", "submit"): (1.0, 2),
+}
+
+
+class TokenBucket:
+    """令牌桶限速器
+
+    采用预约方式：每次请求立即扣除一个令牌（可为负数），并返回需要等待的时间，
+    同步与异步调用共用同一份状态。
+    """
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self._lock = threading.Lock()
+        self._tokens = burst
+        self._updated = time.time()
+
+    def _reserve_locked(self, tokens: float, updated: float) -> Tuple[float, float, float]:
+        now = time.time()
+        tokens = min(self.burst, tokens + (now - updated) * self.rate) - 1
+        wait = max(0.0, -tokens / self.rate)
+        return tokens, now, wait
+
+    def reserve(self) -> float:
+        """预约一个令牌，返回需要等待的秒数"""
+        with self._lock:
+            self._tokens, self._updated, wait = self._reserve_locked(self._tokens, self._updated)
+        return wait
+
+    def acquire(self) -> None:
+        wait = self.reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+    async def aacquire(self) -> None:
+        wait = self.reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+class FileTokenBucket(TokenBucket):
+    """跨进程共享的令牌桶，状态保存在加锁的文件中"""
+
+    def __init__(self, rate: float, burst: float, state_file: str):
+        super().__init__(rate, burst)
+        self.state_file = state_file
+        os.makedirs(os.path.dirname(state_file), exist_ok=True)
+
+    @contextmanager
+    def _file_lock(self):
+        with open(self.state_file, "a+") as f:
+            if fcntl:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+            try:
+                yield f
+            finally:
+                if fcntl:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+                else:
+                    f.seek(0)
+                    msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+    def reserve(self) -> float:
+        with self._lock, self._file_lock() as f:
+            f.seek(0)
+            try:
+                state = json.loads(f.read() or "{}")
+            except ValueError:
+                state = {}
+            tokens, updated, wait = self._reserve_locked(state.get("tokens", self.burst),
+                                                         state.get("updated", time.time()))
+            f.seek(0)
+            f.truncate()
+            f.write(json.dumps({"tokens": tokens, "updated": updated}))
+            f.flush()
+        return wait
+
+
+_limiters: Dict[Tuple[str, str], TokenBucket] = {}
+_limits = dict(DEFAULT_LIMITS)
+# 也可通过环境变量 BK_ASR_SHARED_RATE_LIMIT=1 开启跨进程共享
+_shared = os.environ.get("BK_ASR_SHARED_RATE_LIMIT") == "1"
+_lock = threading.Lock()
+
+
+def get_limiter(engine: str, endpoint: str) -> Optional[TokenBucket]:
+    """获取 (引擎, 接口) 对应的限速器，进程内所有引擎实例共享；未配置的接口返回 None"""
+    key = (engine, endpoint)
+    with _lock:
+        if key not in _limiters:
+            if key not in _limits:
+                return None
+            rate, burst = _limits[key]
+            if _shared:
+                state_file = os.path.join(STATE_DIR, f"{engine}-{endpoint}.json")
+                _limiters[key] = FileTokenBucket(rate, burst, state_file)
+            else:
+                _limiters[key] = TokenBucket(rate, burst)
+        return _limiters[key]
+
+
+def configure(engine: str, endpoint: str, rate: float, burst: float) -> None:
+    """设置某个接口的限速"""
+    with _lock:
+        _limits[(engine, endpoint)] = (rate, burst)
+        _limiters.pop((engine, endpoint), None)
+
+
+def set_shared(shared: bool) -> None:
+    """是否通过锁文件在多个进程间共享限速状态（如 GUI 与命令行批处理同时运行）"""
+    global _shared
+    with _lock:
+        _shared = shared
+        _limiters.clear()
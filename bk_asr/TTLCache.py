@@ -0,0 +1,41 @@
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+from .SingleFlight import SingleFlight
+
+
+class TTLCache:
+    """带过期时间的进程内缓存
+
+    get_or_create 在条目缺失或过期时调用 factory 重新生成，
+    并发的相同 key 只会生成一次，其余调用者共享结果。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries: Dict[Hashable, Tuple[float, Any]] = {}
+        self._flight = SingleFlight()
+
+    def get_or_create(self, key: Hashable, factory: Callable[[], Any], ttl: float) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                return entry[1]
+
+        def create():
+            value = factory()
+            with self._lock:
+                self._entries[key] = (time.monotonic() + ttl, value)
+            return value
+
+        value, _ = self._flight.do(repr(key), create)
+        return value
+
+    def invalidate(self, key: Hashable) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
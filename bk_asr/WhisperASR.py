@@ -24,7 +24,7 @@ class WhisperASR(BaseASR):
         return [ASRDataSeg(u['text'], u['start'], u['end']) for u in resp_data['segments']]
 
     def _get_key(self) -> str:
-        return f"{self.__class__.__name__}-{self.model}-{self.crc32_hex}-{self.model}"
+        return f"{self.__class__.__name__}-{self.model}-{self.cache_id}-{self.model}"
 
     def _submit(self) -> dict:
         completion = self.client.audio.transcriptions.create(
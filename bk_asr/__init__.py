@@ -1,12 +1,61 @@
+import asyncio
+from typing import AsyncIterator, Iterable, Tuple, Union
+
+# 以别名导入，避免 bk_asr.ASRData 子模块属性被同名类覆盖
+from .ASRData import ASRData as _ASRData
+from .ASRRouter import AutoASR
 from .BcutASR import BcutASR
+from .ChunkedASR import ChunkedASR
+from .HedgedASR import HedgedASR
 from .JianYingASR import JianYingASR
 from .KuaiShouASR import KuaiShouASR
 # from .WhisperASR import WhisperASR
 
-__all__ = ["BcutASR", "JianYingASR", "KuaiShouASR"]
+__all__ = ["BcutASR", "JianYingASR", "KuaiShouASR", "ChunkedASR", "HedgedASR", "AutoASR"]
+
+# transcribe_many 默认同时进行的任务数
+DEFAULT_CONCURRENCY = 32
 
 
 def transcribe(audio_file, platform):
     assert platform in __all__
     asr = globals()[platform](audio_file)
     return asr.run()
+
+
+async def atranscribe(audio_file, platform, **kwargs) -> _ASRData:
+    """transcribe 的异步版本"""
+    assert platform in __all__
+    # 计算校验值需要读取整个文件，放到线程中执行
+    asr = await asyncio.to_thread(globals()[platform], audio_file, **kwargs)
+    return await asr.arun()
+
+
+async def transcribe_many(audio_files: Iterable, platform: str, concurrency: int = DEFAULT_CONCURRENCY,
+                          **kwargs) -> AsyncIterator[Tuple[object, Union[_ASRData, BaseException]]]:
+    """批量转录，按完成顺序产出 (audio_file, 结果)
+
+    单个文件失败不会中断整个批次，此时结果为对应的异常对象。
+
+    用法::
+
+        async for audio_file, result in transcribe_many(paths, "BcutASR", concurrency=100):
+            ...
+    """
+    assert platform in __all__
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def transcribe_one(audio_file):
+        async with semaphore:
+            try:
+                return audio_file, await atranscribe(audio_file, platform, **kwargs)
+            except (Exception, SystemExit) as e:
+                return audio_file, e
+
+    tasks = [asyncio.ensure_future(transcribe_one(audio_file)) for audio_file in audio_files]
+    try:
+        for task in asyncio.as_completed(tasks):
+            yield await task
+    finally:
+        for task in tasks:
+            task.cancel()